@@ -0,0 +1,278 @@
+#!/bin/bash
+# Notification / Stop hook 的异步通知分发器
+#
+# hook 只调用 enqueue：把事件写入本地队列后立即返回，不等待网络请求。
+# 后台 drain 进程负责合并短时间内的重复事件、限速、批量发送、失败重试 (指数退避)，
+# 并丢弃过期事件；空闲一段时间后自动退出，下次 enqueue 时再启动。
+#
+# 用法: notify.sh enqueue [--token <Bark Token>] <类别> <标题> [内容]
+#       notify.sh status
+#       notify.sh drain          # 由 enqueue 自动在后台启动
+#
+# 未指定内容且标准输入不是终端时，从 hook 输入的 JSON 中读取 "message" 字段。
+
+SPOOL="${CLAUDE_NOTIFY_SPOOL:-${XDG_RUNTIME_DIR:-/tmp}/claude-notify-$(id -u)}"
+# 发送通道，空格分隔: bark / sound / command / log
+# (队列中每个事件一行: 时间 类别 token 标题 内容 [待重发的通道，逗号分隔])
+SINKS="${CLAUDE_NOTIFY_SINKS:-sound bark}"
+BARK_URL="${CLAUDE_NOTIFY_BARK_URL:-https://api.day.app}"
+# 收到事件后等待的合并窗口 (秒)
+COALESCE="${CLAUDE_NOTIFY_COALESCE:-1}"
+# 两次发送的最小间隔 (秒)，间隔内到达的事件合并为一条
+MIN_INTERVAL="${CLAUDE_NOTIFY_MIN_INTERVAL:-5}"
+# 事件超过该时长 (秒) 仍未发出则丢弃
+TTL="${CLAUDE_NOTIFY_TTL:-300}"
+RETRIES="${CLAUDE_NOTIFY_RETRIES:-4}"
+TIMEOUT="${CLAUDE_NOTIFY_TIMEOUT:-5}"
+# drain 进程空闲多久后退出 (秒)
+IDLE_EXIT="${CLAUDE_NOTIFY_IDLE_EXIT:-60}"
+
+# 事件中包含 Bark Token，队列和日志只允许当前用户读写
+umask 077
+
+now() {
+    echo "${EPOCHSECONDS:-$(date +%s)}"
+}
+
+log() {
+    echo "$(date '+%Y-%m-%d %H:%M:%S') $*" >>"$SPOOL/notify.log"
+}
+
+# 创建队列目录；拒绝使用符号链接或其他用户创建的目录 (没有 XDG_RUNTIME_DIR 时位于共享的 /tmp)
+prepare_spool() {
+    [ -d "$SPOOL" ] || mkdir -p -m 700 "$SPOOL" 2>/dev/null
+    local owner
+    owner=$(stat -c %u "$SPOOL" 2>/dev/null || stat -f %u "$SPOOL" 2>/dev/null)
+    if [ -L "$SPOOL" ] || [ ! -d "$SPOOL" ] || [ "$owner" != "$(id -u)" ]; then
+        echo "notify: 队列目录不可用或不属于当前用户: $SPOOL" >&2
+        return 1
+    fi
+    chmod 700 "$SPOOL" && mkdir -p "$SPOOL/queue"
+}
+
+drain_running() {
+    local pid
+    pid=$(cat "$SPOOL/drain.lock/pid" 2>/dev/null) && kill -0 "$pid" 2>/dev/null
+}
+
+enqueue() {
+    local token=""
+    if [ "$1" = "--token" ]; then
+        token="$2"
+        shift 2
+    fi
+    local kind="${1:-notification}" title="${2:-Claude Code}" body="$3"
+
+    if [ -z "$body" ] && [ ! -t 0 ]; then
+        body=$(sed -n 's/.*"message"[[:space:]]*:[[:space:]]*"\([^"]*\)".*/\1/p' | head -n 1)
+    fi
+
+    prepare_spool || return 1
+    local ts file
+    ts=$(now)
+    file="$SPOOL/queue/$ts.$$.$RANDOM"
+    # 单行制表符分隔，先写临时文件再 mv，drain 不会读到半条事件
+    printf '%s\t%s\t%s\t%s\t%s\n' "$ts" "$kind" "$token" "$title" "$body" | tr -d '\r' >"$file.tmp"
+    mv "$file.tmp" "$file"
+
+    drain_running && return 0
+    if command -v setsid >/dev/null 2>&1; then
+        setsid bash "$0" drain </dev/null >/dev/null 2>&1 &
+    else
+        nohup bash "$0" drain </dev/null >/dev/null 2>&1 &
+    fi
+    disown 2>/dev/null
+    return 0
+}
+
+# ---- 发送通道 ----
+
+sink_bark() {
+    local token="$1" title="$2" body="$3"
+    [ -n "$token" ] && [ "$token" != "YOUR_BARK_TOKEN_HERE" ] || return 0
+    curl -fsS -o /dev/null --max-time "$TIMEOUT" -X POST "$BARK_URL/$token" \
+        --data-urlencode "title=$title" \
+        --data-urlencode "body=$body" \
+        --data-urlencode "group=claude"
+}
+
+sink_sound() {
+    if command -v afplay >/dev/null 2>&1; then
+        afplay /System/Library/Sounds/Glass.aiff
+    elif command -v paplay >/dev/null 2>&1; then
+        paplay /usr/share/sounds/freedesktop/stereo/complete.oga 2>/dev/null
+    fi
+    return 0
+}
+
+# 自定义命令: CLAUDE_NOTIFY_COMMAND 以 <标题> <内容> 为参数调用
+sink_command() {
+    [ -n "$CLAUDE_NOTIFY_COMMAND" ] || return 0
+    $CLAUDE_NOTIFY_COMMAND "$2" "$3"
+}
+
+sink_log() {
+    printf '%s\t%s\t%s\n' "$1" "$2" "$3" >>"${CLAUDE_NOTIFY_LOG:-$SPOOL/sent.log}"
+}
+
+# 通过指定通道发送一条消息，失败时指数退避重试；失败的通道记录在 FAILED_SINKS
+send() {
+    local sinks="$1" token="$2" title="$3" body="$4" oldest="$5"
+    local sink attempt delay rc
+    FAILED_SINKS=""
+    for sink in $sinks; do
+        attempt=1
+        delay=1
+        until "sink_$sink" "$token" "$title" "$body"; do
+            rc=$?
+            if [ "$attempt" -ge "$RETRIES" ] || [ $(($(now) + delay - oldest)) -gt "$TTL" ]; then
+                log "failed sink=$sink rc=$rc title=$title"
+                FAILED_SINKS="${FAILED_SINKS:+$FAILED_SINKS,}$sink"
+                break
+            fi
+            log "retry sink=$sink attempt=$attempt rc=$rc"
+            sleep "$delay"
+            attempt=$((attempt + 1))
+            delay=$((delay * 2))
+        done
+    done
+    [ -z "$FAILED_SINKS" ]
+}
+
+# 发送失败的事件放回队列，只对失败的通道重发 (第 6 列)，直到超过 TTL 被丢弃
+requeue() {
+    local batch="$1" token="$2" sinks="$3" cutoff="$4" event
+    for event in "$batch"/*; do
+        awk -F'\t' -v OFS='\t' -v c="$cutoff" -v t="$token" -v s="$sinks" -v f="$FAILED_SINKS" '
+            $1 >= c && $3 == t && $6 == s { $6 = f; print; found = 1 }
+            END { exit !found }' "$event" >"$event.tmp" || { rm -f "$event.tmp"; continue; }
+        mv "$event.tmp" "$SPOOL/queue/${event##*/}"
+        rm -f "$event"
+    done
+}
+
+# 处理 batch 目录中的事件: 丢弃过期事件，同一 token (和待重发通道) 下合并为一条消息
+flush() {
+    local batch="$1" cutoff
+    cutoff=$(($(now) - TTL))
+
+    local key token sinks
+    for key in $(cat "$batch"/* | awk -F'\t' -v c="$cutoff" '$1 >= c { print ($3 == "" ? "-" : $3) "|" ($6 == "" ? "-" : $6) }' | sort -u); do
+        token="${key%%|*}"
+        sinks="${key#*|}"
+        [ "$token" = "-" ] && token=""
+        [ "$sinks" = "-" ] && sinks=""
+        local groups title body oldest
+        # 按 (类别, 标题) 合并，记录次数和最后一条内容
+        groups=$(cat "$batch"/* | awk -F'\t' -v c="$cutoff" -v t="$token" -v s="$sinks" '
+            $1 >= c && $3 == t && $6 == s {
+                k = $2 "\t" $4
+                if (!(k in n)) order[++m] = k
+                n[k]++; last[k] = $5
+                if (oldest == "" || $1 < oldest) oldest = $1
+            }
+            END {
+                print oldest
+                for (i = 1; i <= m; i++) {
+                    split(order[i], f, "\t")
+                    print f[2] (n[order[i]] > 1 ? " (x" n[order[i]] ")" : "") "\t" last[order[i]]
+                }
+            }')
+        oldest=$(head -n 1 <<<"$groups")
+        groups=$(tail -n +2 <<<"$groups")
+        if [ "$(wc -l <<<"$groups")" -eq 1 ]; then
+            title=$(cut -f1 <<<"$groups")
+            body=$(cut -f2 <<<"$groups")
+        else
+            title="Claude Code: $(wc -l <<<"$groups" | tr -d ' ') 条通知"
+            body=$(awk -F'\t' '{ print $1 ($2 == "" ? "" : ": " $2) }' <<<"$groups")
+        fi
+        local events
+        events=$(cat "$batch"/* | awk -F'\t' -v c="$cutoff" -v t="$token" -v s="$sinks" '$1 >= c && $3 == t && $6 == s' | wc -l | tr -d ' ')
+        if ! send "${sinks:-$SINKS}" "$token" "$title" "$body" "$oldest"; then
+            requeue "$batch" "$token" "$sinks" "$cutoff"
+            log "requeued events=$events sinks=$FAILED_SINKS"
+            continue
+        fi
+        log "sent events=$events title=$title"
+    done
+
+    local dropped
+    dropped=$(cat "$batch"/* | awk -F'\t' -v c="$cutoff" '$1 < c' | wc -l | tr -d ' ')
+    [ "$dropped" -gt 0 ] && log "dropped stale=$dropped"
+    return 0
+}
+
+drain() {
+    prepare_spool || return 1
+    # 同一时间只运行一个 drain 进程；持有锁的进程已退出时接管
+    if ! mkdir "$SPOOL/drain.lock" 2>/dev/null; then
+        drain_running && return 0
+        rm -rf "$SPOOL/drain.lock"
+        mkdir "$SPOOL/drain.lock" 2>/dev/null || return 0
+    fi
+    echo $$ >"$SPOOL/drain.lock/pid"
+    trap 'rm -rf "$SPOOL/drain.lock"' EXIT
+
+    local idle_since last_sent=0 batch
+    idle_since=$(now)
+    while true; do
+        if [ -z "$(ls "$SPOOL/queue")" ]; then
+            [ $(($(now) - idle_since)) -ge "$IDLE_EXIT" ] && break
+            sleep 0.2
+            continue
+        fi
+
+        # 合并窗口 + 限速: 等待期间到达的事件一起发送
+        sleep "$COALESCE"
+        local delay=$((last_sent + MIN_INTERVAL - $(now)))
+        [ "$delay" -gt 0 ] && sleep "$delay"
+
+        batch="$SPOOL/batch.$$"
+        mkdir -p "$batch"
+        local event
+        for event in "$SPOOL/queue"/*; do
+            case "$event" in
+                *.tmp) ;;
+                *) mv "$event" "$batch"/ ;;
+            esac
+        done
+        [ -n "$(ls "$batch")" ] && flush "$batch"
+        rm -rf "$batch"
+        last_sent=$(now)
+        idle_since=$last_sent
+    done
+
+    # 退出前释放锁；释放期间若有新事件入队 (enqueue 看到锁而没有启动新进程)，重新处理
+    rm -rf "$SPOOL/drain.lock"
+    trap - EXIT
+    if [ -n "$(ls "$SPOOL/queue")" ]; then
+        exec bash "$0" drain
+    fi
+}
+
+status() {
+    local queued
+    queued=$(ls "$SPOOL/queue" 2>/dev/null | grep -vc '\.tmp$')
+    echo "队列目录: $SPOOL"
+    echo "待发送事件: $queued"
+    if drain_running; then
+        echo "drain 进程: 运行中 (pid $(cat "$SPOOL/drain.lock/pid"))"
+    else
+        echo "drain 进程: 未运行"
+    fi
+    [ -f "$SPOOL/notify.log" ] || return 0
+    echo "已发送批次: $(grep -c ' sent ' "$SPOOL/notify.log")  失败: $(grep -c ' failed ' "$SPOOL/notify.log")  重新排队: $(grep -c ' requeued ' "$SPOOL/notify.log")  丢弃: $(grep -c ' dropped ' "$SPOOL/notify.log")"
+    echo "最近日志:"
+    tail -n 5 "$SPOOL/notify.log" | sed 's/^/  /'
+}
+
+case "$1" in
+    enqueue) shift; enqueue "$@" ;;
+    drain) drain ;;
+    status) status ;;
+    *)
+        echo "用法: $0 enqueue [--token <Bark Token>] <类别> <标题> [内容] | status" >&2
+        exit 1
+        ;;
+esac
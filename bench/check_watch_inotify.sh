@@ -0,0 +1,73 @@
+#!/bin/bash
+# watch 的 inotify 模式回归检查: 连续多次修改模板，每次都必须推送到目标
+#
+# 用法: bash bench/check_watch_inotify.sh
+# 没有安装 inotifywait 时使用一个替身: 与 inotifywait -m 一样永不退出，
+# 每次修改后由本脚本写入一行事件。不使用轮询模式 (--poll)。
+
+set -e
+
+ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+WORK=$(mktemp -d "${TMPDIR:-/tmp}/claude-watch-check.XXXXXX")
+WATCH_PID=""
+cleanup() {
+    if [ -n "$WATCH_PID" ]; then
+        kill "$WATCH_PID" 2>/dev/null || true
+        wait "$WATCH_PID" 2>/dev/null || true
+    fi
+    rm -rf "$WORK"
+}
+trap cleanup EXIT
+
+export XDG_CACHE_HOME="$WORK/cache"
+export CLAUDE_SYNC_CACHE="$WORK/cache/claude-sync"
+export CLAUDE_SYNC_OFFLINE=1
+
+mkdir -p "$WORK/src/.claude/agents" "$WORK/target"
+echo "v0" >"$WORK/src/.claude/agents/a.md"
+
+EVENTS="$WORK/events"
+: >"$EVENTS"
+if ! command -v inotifywait >/dev/null 2>&1; then
+    mkdir -p "$WORK/bin"
+    cat >"$WORK/bin/inotifywait" <<EOF
+#!/bin/bash
+exec tail -n 0 -f "$EVENTS"
+EOF
+    chmod +x "$WORK/bin/inotifywait"
+    export PATH="$WORK/bin:$PATH"
+fi
+
+bash "$ROOT/sync-claude-config.sh" watch --source "$WORK/src" --debounce 0.2 "$WORK/target" \
+    >"$WORK/watch.log" 2>&1 &
+WATCH_PID=$!
+
+# 等待目标中的文件内容变为期望值，超时返回 1
+wait_for() {
+    local file="$1" expected="$2" i
+    for i in $(seq 1 50); do
+        [ "$(cat "$file" 2>/dev/null)" = "$expected" ] && return 0
+        sleep 0.1
+    done
+    return 1
+}
+
+status=0
+wait_for "$WORK/target/.claude/agents/a.md" "v0" || status=1
+for n in 1 2 3; do
+    [ "$status" = "0" ] || break
+    echo "v$n" >"$WORK/src/.claude/agents/a.md"
+    echo "$WORK/src/.claude/agents/a.md" >>"$EVENTS"
+    if ! wait_for "$WORK/target/.claude/agents/a.md" "v$n"; then
+        echo "第 $n 次修改没有推送到目标" >&2
+        status=1
+    fi
+done
+
+if [ "$status" = "0" ]; then
+    echo "✓ inotify 模式连续推送正常"
+else
+    echo "✗ inotify 模式推送失败，监听日志:" >&2
+    sed 's/^/  /' "$WORK/watch.log" >&2
+fi
+exit $status
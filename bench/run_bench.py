@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""同步脚本与 setup.sh 的性能基准。
+
+在临时目录中用 file:// 本地仓库作为模板，分别测量不同模板规模、目标数量、
+是否已有 .claude / 旧备份时各脚本的总耗时和分阶段耗时 (脚本通过 CLAUDE_TIMINGS 输出)。
+结果以 JSON 输出，并与保存的基准比较，超出容差时以退出码 1 结束。
+
+用法:
+    python3 bench/run_bench.py                       # 运行并与 bench/baseline.json 比较
+    python3 bench/run_bench.py --save-baseline       # 运行并保存为新的基准
+    python3 bench/run_bench.py --sizes 10,2000 --targets 10,50 --repeat 5 -o result.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+SYNC = ROOT / "sync-claude-config.sh"
+QUICK = ROOT / "quick-sync.sh"
+SETUP = ROOT / "setup.sh"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@localhost",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@localhost",
+}
+# 模板中的子目录，文件按顺序分布到这些目录
+SUBDIRS = ["agents", "commands", "output-styles", "commands/git", "agents/review"]
+
+
+def git(*args: str, cwd: Path) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        env={**os.environ, **GIT_ENV},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+class Fixture:
+    """一个 file:// 模板仓库及其共用的缓存和目标目录。"""
+
+    def __init__(self, workdir: Path, size: int) -> None:
+        self.size = size
+        self.root = workdir / f"fixture-{size}"
+        self.repo = self.root / "template"
+        self.cache = self.root / "cache"
+        self.revision = 0
+        self._create()
+
+    def _create(self) -> None:
+        claude = self.repo / ".claude"
+        claude.mkdir(parents=True)
+        (claude / "settings.json").write_text(
+            json.dumps({"hooks": {"Stop": [{"command": "notify YOUR_BARK_TOKEN_HERE"}]}}, indent=2)
+        )
+        for i in range(self.size - 1):
+            path = claude / SUBDIRS[i % len(SUBDIRS)] / f"file_{i:05d}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# file {i}\n\n" + "lorem ipsum dolor sit amet\n" * 40)
+        git("init", "-q", "-b", "main", cwd=self.repo)
+        git("config", "uploadpack.allowFilter", "true", cwd=self.repo)
+        git("add", "-A", cwd=self.repo)
+        git("commit", "-q", "-m", "fixture", cwd=self.repo)
+
+    def bump(self, files: int = 3) -> None:
+        """修改模板中的若干文件并提交，模拟上游更新。"""
+        self.revision += 1
+        paths = sorted((self.repo / ".claude").rglob("*.md"))[:files]
+        for path in paths:
+            with path.open("a") as f:
+                f.write(f"revision {self.revision}\n")
+        git("commit", "-q", "-am", f"revision {self.revision}", cwd=self.repo)
+
+    def env(self) -> dict[str, str]:
+        return {
+            **os.environ,
+            "XDG_CACHE_HOME": str(self.cache),
+            "CLAUDE_SYNC_CACHE": str(self.cache / "claude-sync"),
+            "CLAUDE_SYNC_REPO": self.repo.as_uri(),
+        }
+
+    def target(self, name: str, fresh: bool = True) -> Path:
+        path = self.root / "targets" / name
+        if fresh and path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def wipe_cache(self) -> None:
+        shutil.rmtree(self.cache, ignore_errors=True)
+
+
+class Scenario:
+    def __init__(
+        self,
+        name: str,
+        prepare: Callable[[], list[str]],
+        stdin: str = "",
+        env: Callable[[], dict[str, str]] | None = None,
+    ) -> None:
+        self.name = name
+        self.prepare = prepare
+        self.stdin = stdin
+        self.env = env
+
+
+def run_once(scenario: Scenario, workdir: Path) -> dict:
+    command = scenario.prepare()
+    timings = workdir / "timings.jsonl"
+    timings.unlink(missing_ok=True)
+    env = {**(scenario.env() if scenario.env else os.environ), "CLAUDE_TIMINGS": str(timings)}
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        command, input=scenario.stdin, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"{scenario.name} 失败 (退出码 {result.returncode}):\n{result.stdout}\n{result.stderr}"
+        )
+
+    phases: dict[str, float] = {}
+    if timings.exists():
+        for line in timings.read_text().splitlines():
+            entry = json.loads(line)
+            phases[entry["phase"]] = phases.get(entry["phase"], 0) + entry["ms"]
+    return {"wall_ms": wall_ms, "phases": phases}
+
+
+def measure(scenario: Scenario, workdir: Path, repeat: int) -> dict:
+    runs = [run_once(scenario, workdir) for _ in range(repeat)]
+    phase_names = sorted({name for run in runs for name in run["phases"]})
+    return {
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+        "phases": {
+            name: round(statistics.median(run["phases"].get(name, 0) for run in runs), 1)
+            for name in phase_names
+        },
+    }
+
+
+def sync_scenarios(fixture: Fixture, target_counts: list[int]) -> list[Scenario]:
+    size = fixture.size
+
+    def sync(*args: str | Path) -> list[str]:
+        return ["bash", str(SYNC), *map(str, args)]
+
+    def cold() -> list[str]:
+        fixture.wipe_cache()
+        return sync(fixture.target("cold"))
+
+    def unchanged() -> list[str]:
+        target = fixture.target("unchanged", fresh=False)
+        subprocess.run(sync(target), env=fixture.env(), check=True, capture_output=True)
+        return sync(target)
+
+    def update() -> list[str]:
+        target = fixture.target("update", fresh=False)
+        subprocess.run(sync(target), env=fixture.env(), check=True, capture_output=True)
+        fixture.bump()
+        return sync(target)
+
+    def existing() -> list[str]:
+        # 已有本地修改过的 .claude，以及旧版本留下的 20 个 .claude.backup.* 目录
+        target = fixture.target("existing")
+        subprocess.run(
+            ["git", "--work-tree", str(target), "checkout", "HEAD", "--", ".claude"],
+            cwd=fixture.repo, check=True, env={**os.environ, **GIT_ENV},
+        )
+        for path in sorted((target / ".claude").rglob("*.md"))[::2]:
+            path.write_text("local edit\n")
+        for i in range(20):
+            shutil.copytree(target / ".claude", target / f".claude.backup.{i:08d}")
+        fixture.bump()
+        return sync(target)
+
+    scenarios = [
+        Scenario(f"sync.cold/{size}", cold, env=fixture.env),
+        Scenario(f"sync.unchanged/{size}", unchanged, env=fixture.env),
+        Scenario(f"sync.update/{size}", update, env=fixture.env),
+        Scenario(f"sync.existing/{size}", existing, env=fixture.env),
+    ]
+
+    for count in target_counts:
+        def fanout(count: int = count) -> list[str]:
+            for i in range(count):
+                fixture.target(f"fanout-{count}/{i:04d}", fresh=False)
+            glob = fixture.root / "targets" / f"fanout-{count}" / "*"
+            subprocess.run(sync("--glob", glob), env=fixture.env(), check=True, capture_output=True)
+            fixture.bump()
+            return sync("-j", "8", "--glob", glob)
+
+        def check(count: int = count) -> list[str]:
+            # 自行同步一次再更新模板，不依赖其他场景留下的目标；检查时各目标均为 behind
+            for i in range(count):
+                fixture.target(f"check-{count}/{i:04d}", fresh=False)
+            glob = fixture.root / "targets" / f"check-{count}" / "*"
+            subprocess.run(sync("--glob", glob), env=fixture.env(), check=True, capture_output=True)
+            fixture.bump()
+            return sync("check", "-j", "8", "--glob", glob)
+
+        scenarios.append(Scenario(f"fanout.{count}/{size}", fanout, env=fixture.env))
+        scenarios.append(Scenario(f"check.{count}/{size}", check, env=fixture.env))
+
+    def quick() -> list[str]:
+        return ["bash", str(QUICK), str(fixture.target("quick"))]
+
+    # 输入 Token，同时测量占位符替换
+    scenarios.append(Scenario(f"quick-sync/{size}", quick, stdin="BENCHTOKEN\n", env=fixture.env))
+    return scenarios
+
+
+def setup_scenarios(workdir: Path, python: bool) -> list[Scenario]:
+    if not shutil.which("uv"):
+        # 没有 uv 时 setup.sh 会联网安装，不适合做基准
+        print("未安装 uv，跳过 setup.sh 基准", file=sys.stderr)
+        return []
+
+    def project(*flags: str) -> list[str]:
+        path = workdir / "setup-project"
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir()
+        return ["bash", "-c", f'cd "{path}" && bash "{SETUP}" {" ".join(flags)}']
+
+    scenarios = [Scenario("setup.git", project, stdin="n\n")]
+    if python:
+        scenarios.append(Scenario("setup.python", project, stdin="y\n"))
+        # 各阶段中包含 mypy.cold / mypy.warm
+        scenarios.append(Scenario("setup.python-dmypy", lambda: project("--incremental-mypy"), stdin="y\n"))
+    return scenarios
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list[str]:
+    """返回超出容差的条目 (总耗时和各阶段)。"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        pairs = [("wall", current["wall_ms"], previous["wall_ms"])]
+        pairs += [
+            (phase, ms, previous["phases"][phase])
+            for phase, ms in current["phases"].items()
+            if phase in previous["phases"]
+        ]
+        for label, now, before in pairs:
+            if now - before > min_delta_ms and now > before * (1 + tolerance):
+                regressions.append(f"{name} [{label}]: {before:.1f}ms -> {now:.1f}ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,200,2000", help="模板文件数，逗号分隔")
+    parser.add_argument("--targets", default="10", help="批量模式的目标数量，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每个场景的重复次数 (取中位数)")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的场景")
+    parser.add_argument("--setup-python", action="store_true", help="同时测量 setup.sh 的 Python 初始化 (需要联网或离线缓存)")
+    parser.add_argument("-o", "--output", type=Path, help="结果写入文件 (默认输出到标准输出)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基准")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对变慢比例")
+    parser.add_argument("--min-delta-ms", type=float, default=20, help="小于该绝对差值的变化不算回归")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    target_counts = [int(s) for s in args.targets.split(",") if s]
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="claude-bench-") as tmp:
+        workdir = Path(tmp)
+        scenarios: list[Scenario] = []
+        for size in sizes:
+            scenarios += sync_scenarios(Fixture(workdir, size), target_counts)
+        scenarios += setup_scenarios(workdir, args.setup_python)
+
+        for scenario in scenarios:
+            if args.filter not in scenario.name:
+                continue
+            print(f"运行 {scenario.name} ...", file=sys.stderr)
+            results[scenario.name] = measure(scenario, workdir, args.repeat)
+
+    report = {
+        "meta": {
+            "platform": platform.platform(),
+            "git": git("--version", cwd=ROOT),
+            "bash": subprocess.run(
+                ["bash", "-c", "echo $BASH_VERSION"], capture_output=True, text=True
+            ).stdout.strip(),
+            "repeat": args.repeat,
+            "commit": git("rev-parse", "--short", "HEAD", cwd=ROOT),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        args.baseline.write_text(output + "\n")
+        print(f"已保存基准: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not args.baseline.exists():
+        # 耗时与机器相关，仓库中不提交基准，每台机器 (CI 主机) 需先运行一次 --save-baseline
+        print(f"没有基准文件 {args.baseline}，跳过比较 (先在本机使用 --save-baseline 生成)", file=sys.stderr)
+        return 0
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for line in regressions:
+        print(f"回归: {line}", file=sys.stderr)
+    if not regressions:
+        print("与基准相比没有明显变慢", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
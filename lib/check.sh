@@ -0,0 +1,120 @@
+#!/bin/bash
+# 只读的漂移检查: 对比目标 .claude 与模板，不修改目标
+#
+# 模板一侧只需要 claude_sync_stage 读取的树对象 (文件的 git blob 哈希)；
+# 目标一侧计算相同算法的 blob 哈希，并按 (路径, mtime, 大小) 缓存在
+# $CLAUDE_SYNC_CACHE/hashes 下，文件未变化时重复检查不需要读取文件内容。
+#
+# 每个文件的状态:
+#   up-to-date  与模板一致
+#   behind      与上次同步的版本一致，但模板已更新 (包括模板新增或删除的文件)
+#   modified    本地修改过 (与上次同步的版本不同，或没有同步记录)
+
+CLAUDE_HASH_CACHE="$CLAUDE_SYNC_CACHE/hashes"
+
+# 列出目录下的文件和符号链接: "<路径>\t<mtime>\t<大小>"
+_claude_stat_list() {
+    if find "$1" -maxdepth 0 -printf '' 2>/dev/null; then
+        find "$1" \( -type f -o -type l \) -printf '%P\t%T@\t%s\n'
+    else
+        # BSD find 没有 -printf
+        (cd "$1" && find . \( -type f -o -type l \) -exec stat -f '%N%t%m%t%z' {} + | sed 's|^\./||')
+    fi
+}
+
+# 计算目录下所有文件的 git blob 哈希，输出 "<哈希>\t<路径>"
+# 用法: claude_hash_tree <目录>
+claude_hash_tree() {
+    local dir="$1" abs cache
+    abs=$(cd "$dir" && pwd) || return 1
+    cache="$CLAUDE_HASH_CACHE/$(basename "$(dirname "$abs")").$(printf '%s' "$abs" | cksum | cut -d' ' -f1).tsv"
+    mkdir -p "$CLAUDE_HASH_CACHE" || return 1
+    [ -f "$cache" ] || : >"$cache"
+
+    # 命中缓存: "hit\t路径\tmtime\t大小\t哈希"；未命中: "miss\t路径\tmtime\t大小"
+    local lookup
+    lookup=$(_claude_stat_list "$abs" | awk -F'\t' -v manifest="$CLAUDE_SYNC_MANIFEST" '
+        FILENAME == ARGV[1] { h[$1 "\t" $2 "\t" $3] = $4; next }
+        $1 == manifest { next }
+        { print (($0 in h) ? "hit\t" $0 "\t" h[$0] : "miss\t" $0) }' "$cache" -) || return 1
+
+    local fresh=""
+    if grep -q '^miss' <<<"$lookup"; then
+        local -a files=() links=()
+        local kind path mtime size entry
+        while IFS=$'\t' read -r kind path mtime size; do
+            [ "$kind" = "miss" ] || continue
+            entry="$path"$'\t'"$mtime"$'\t'"$size"
+            if [ -L "$abs/$path" ]; then
+                # git 中符号链接的 blob 内容是链接目标本身
+                links+=("$entry"$'\t'"$(printf '%s' "$(readlink "$abs/$path")" | git hash-object --stdin)")
+            else
+                files+=("$entry")
+            fi
+        done <<<"$lookup"
+        fresh=$(
+            if [ ${#files[@]} -gt 0 ]; then
+                paste <(printf '%s\n' "${files[@]}") \
+                    <(for entry in "${files[@]}"; do echo "$abs/${entry%%$'\t'*}"; done \
+                        | git hash-object --no-filters --stdin-paths)
+            fi
+            [ ${#links[@]} -eq 0 ] || printf '%s\n' "${links[@]}"
+        ) || return 1
+    fi
+
+    # 缓存内容变化时才重写
+    local entries
+    entries=$({ grep '^hit' <<<"$lookup" | cut -f2-5; [ -n "$fresh" ] && echo "$fresh"; } | sort)
+    if [ "$entries" != "$(cat "$cache")" ]; then
+        echo "$entries" >"$cache.tmp.${BASHPID:-$$}" && mv "$cache.tmp.${BASHPID:-$$}" "$cache"
+    fi
+    [ -n "$entries" ] && awk -F'\t' '{ print $4 "\t" $1 }' <<<"$entries"
+    return 0
+}
+
+# 检查一个目标: claude_check_target <目标项目路径>
+# 输出非 up-to-date 的文件，结果 (up-to-date / behind / modified) 写入 CLAUDE_SYNC_RESULT
+claude_check_target() {
+    local target="$1"
+    local dir="$target/.claude"
+    CLAUDE_SYNC_RESULT=""
+
+    if [ ! -d "$target" ]; then
+        claude_err "目标目录不存在: $target"
+        return 1
+    fi
+
+    local hashes="" report manifest="$dir/$CLAUDE_SYNC_MANIFEST"
+    if [ -d "$dir" ]; then
+        hashes=$(claude_timed check.hash claude_hash_tree "$dir") || return 1
+    fi
+    [ -f "$manifest" ] || manifest=/dev/null
+
+    report=$(awk -F'\t' '
+        FILENAME == ARGV[1] { split($1, f, " "); up[$2] = f[2]; next }
+        FILENAME == ARGV[2] { split($1, f, " "); base[$2] = f[2]; next }
+        NF { loc[$2] = $1 }
+        END {
+            for (p in up) {
+                if (!(p in loc)) st = (p in base) ? "modified" : "behind"
+                else if (loc[p] == up[p]) st = "up-to-date"
+                else if ((p in base) && loc[p] == base[p]) st = "behind"
+                else st = "modified"
+                print st "\t" p
+            }
+            # 模板已删除、上次同步写入过的文件
+            for (p in base) {
+                if (!(p in up) && (p in loc)) print (loc[p] == base[p] ? "behind" : "modified") "\t" p
+            }
+        }' "$CLAUDE_SYNC_STAGE/tree" "$manifest" - <<<"$hashes" | sort -t$'\t' -k2) || return 1
+
+    if grep -q '^modified' <<<"$report"; then
+        CLAUDE_SYNC_RESULT=modified
+    elif grep -q '^behind' <<<"$report"; then
+        CLAUDE_SYNC_RESULT=behind
+    else
+        CLAUDE_SYNC_RESULT=up-to-date
+    fi
+    grep -v '^up-to-date' <<<"$report" | awk -F'\t' 'NF { printf "  %-10s %s\n", $1, $2 }'
+    return 0
+}
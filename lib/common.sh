@@ -0,0 +1,112 @@
+#!/bin/bash
+# quick-sync.sh 与 sync-claude-config.sh 共用的基础函数
+# 由入口脚本 source 引入，不要直接执行
+
+# lib/ 的版本: 函数或接口变化时递增，并同步修改入口脚本中的 CLAUDE_SYNC_LIB_REQUIRED
+# (通过 curl 运行时，入口脚本据此判断缓存中的 lib 是否需要重新下载)
+CLAUDE_SYNC_LIB_VERSION=2
+
+CLAUDE_SYNC_CACHE="${CLAUDE_SYNC_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/claude-sync}"
+CLAUDE_SYNC_LIB_DIR="${CLAUDE_SYNC_LIB_DIR:-$CLAUDE_SYNC_CACHE/lib}"
+CLAUDE_SYNC_RAW_URL="${CLAUDE_SYNC_RAW_URL:-https://raw.githubusercontent.com/developer-hq/ClaudeCodeTemplate/main}"
+CLAUDE_SYNC_BRANCH="${CLAUDE_SYNC_BRANCH:-main}"
+CLAUDE_SYNC_OFFLINE="${CLAUDE_SYNC_OFFLINE:-0}"
+
+# 颜色输出
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+claude_log() {
+    echo -e "${YELLOW}$1${NC}"
+}
+
+claude_ok() {
+    echo -e "${GREEN}✓ $1${NC}"
+}
+
+claude_warn() {
+    echo -e "${YELLOW}⚠️  $1${NC}" >&2
+}
+
+claude_err() {
+    echo -e "${RED}错误: $1${NC}" >&2
+}
+
+# 加载 lib 下的模块；通过 curl 运行时按需下载到缓存目录
+claude_require() {
+    local file="$CLAUDE_SYNC_LIB_DIR/$1.sh"
+    if [ ! -f "$file" ]; then
+        mkdir -p "$CLAUDE_SYNC_LIB_DIR" || return 1
+        if ! curl -fsSL "$CLAUDE_SYNC_RAW_URL/lib/$1.sh" -o "$file.tmp.$$"; then
+            rm -f "$file.tmp.$$"
+            claude_err "无法下载模块: lib/$1.sh"
+            return 1
+        fi
+        mv "$file.tmp.$$" "$file"
+    fi
+    source "$file"
+}
+
+# 在互斥锁内执行命令；没有 flock 的系统 (macOS) 退化为 mkdir 锁
+claude_with_lock() {
+    local lock="$1"
+    shift
+    mkdir -p "$(dirname "$lock")" || return 1
+    if command -v flock >/dev/null 2>&1; then
+        (
+            flock 9 || exit 1
+            "$@"
+        ) 9>"$lock"
+    else
+        # mkdir 锁记录持有者的 pid；持有者已退出 (例如被 Ctrl-C 中断) 时接管，
+        # 没有 pid 的锁 (刚创建或旧版本留下) 超过 1 分钟视为失效
+        local owner
+        until mkdir "$lock.d" 2>/dev/null; do
+            owner=$(cat "$lock.d/pid" 2>/dev/null)
+            if { [ -n "$owner" ] && ! kill -0 "$owner" 2>/dev/null; } \
+                || { [ -z "$owner" ] && [ -n "$(find "$lock.d" -maxdepth 0 -mmin +1 2>/dev/null)" ]; }; then
+                rm -rf "$lock.d"
+                continue
+            fi
+            sleep 0.2
+        done
+        echo "${BASHPID:-$$}" >"$lock.d/pid"
+
+        # 中断时释放锁，之后恢复调用方原有的信号处理
+        local traps rc=0
+        traps=$(trap -p INT TERM)
+        trap "rm -rf '$lock.d'; exit 130" INT TERM
+        "$@" || rc=$?
+        rm -rf "$lock.d"
+        trap - INT TERM
+        [ -n "$traps" ] && eval "$traps"
+        return $rc
+    fi
+}
+
+# 当前时间 (毫秒)；bash 5 使用 EPOCHREALTIME，旧版本退化为秒级精度
+claude_now_ms() {
+    if [ -n "$EPOCHREALTIME" ]; then
+        local t="${EPOCHREALTIME/[.,]/}"
+        echo $((t / 1000))
+    else
+        echo $(($(date +%s) * 1000))
+    fi
+}
+
+# 阶段计时: 设置 CLAUDE_TIMINGS=<文件> 时，每个阶段的耗时以 JSON 行追加到该文件 (供 bench/ 使用)
+# 用法: claude_timed <阶段名> <命令...>
+claude_timed() {
+    local phase="$1" start rc=0
+    shift
+    if [ -z "$CLAUDE_TIMINGS" ]; then
+        "$@"
+        return
+    fi
+    start=$(claude_now_ms)
+    "$@" || rc=$?
+    printf '{"phase": "%s", "ms": %d}\n' "$phase" $(($(claude_now_ms) - start)) >>"$CLAUDE_TIMINGS"
+    return $rc
+}
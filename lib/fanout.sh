@@ -0,0 +1,105 @@
+#!/bin/bash
+# 批量同步: 一次拉取模板，按有限并发应用到多个目标目录
+#
+# 单个目标失败不会中断其他目标，结束后输出每个目标的结果和耗时。
+# 处理函数把结果写入 CLAUDE_SYNC_RESULT；CLAUDE_FANOUT_SHOW_LOG=1 时同时列出每个目标的输出。
+# 设置 CLAUDE_FANOUT_RESULTS=<文件> 时，每个目标的 "状态\t耗时\t目标\t错误" 追加到该文件 (供 watch 计数)。
+
+CLAUDE_FANOUT_SHOW_LOG="${CLAUDE_FANOUT_SHOW_LOG:-0}"
+CLAUDE_FANOUT_RESULTS="${CLAUDE_FANOUT_RESULTS:-}"
+CLAUDE_FANOUT_TARGETS=()
+
+# 默认并发数: CPU 核数
+claude_fanout_default_jobs() {
+    getconf _NPROCESSORS_ONLN 2>/dev/null || echo 4
+}
+
+# 追加目标列表: 每行一个路径，忽略空行和 # 注释
+claude_fanout_read_list() {
+    local line
+    while IFS= read -r line || [ -n "$line" ]; do
+        line="${line%%#*}"
+        line="${line#"${line%%[![:space:]]*}"}"
+        line="${line%"${line##*[![:space:]]}"}"
+        [ -n "$line" ] && CLAUDE_FANOUT_TARGETS+=("$line")
+    done
+}
+
+# 追加匹配 glob 的目录，例如 '/srv/repos/*'
+claude_fanout_add_glob() {
+    local path
+    while IFS= read -r path; do
+        [ -d "$path" ] && CLAUDE_FANOUT_TARGETS+=("$path")
+    done < <(compgen -G "$1" | sort)
+}
+
+# 去掉重复目标，保持原有顺序；同一目录不能被两个任务同时写入
+# 比较前统一为物理路径 (d1、./d1、d1/、绝对路径和符号链接都指向同一目录)；不存在的路径保持原样
+claude_fanout_dedupe() {
+    local path
+    local -a unique=()
+    while IFS= read -r path; do
+        unique+=("$path")
+    done < <(for path in "${CLAUDE_FANOUT_TARGETS[@]}"; do
+            (cd "$path" 2>/dev/null && pwd -P) || echo "$path"
+        done | awk 'NF && !seen[$0]++')
+    CLAUDE_FANOUT_TARGETS=("${unique[@]}")
+}
+
+_claude_fanout_one() {
+    local worker="$1" target="$2" out="$3"
+    local start status message=""
+    start=$(claude_now_ms)
+    if "$worker" "$target" >"$out.log" 2>&1; then
+        status="${CLAUDE_SYNC_RESULT:-updated}"
+    else
+        status=failed
+        message=$(grep . "$out.log" | tail -n 1 | sed $'s/\033\\[[0-9;]*m//g')
+    fi
+    printf '%s\t%s\t%s\t%s\n' "$status" "$(($(claude_now_ms) - start))" "$target" "$message" >"$out"
+}
+
+# 并发执行: claude_fanout <并发数> <处理函数> <目标...>
+# 有目标失败时返回 1
+claude_fanout() {
+    local max_jobs="$1" worker="$2"
+    shift 2
+    local results i=0 target
+    local -a pids=()
+    results=$(mktemp -d "${TMPDIR:-/tmp}/claude-fanout.XXXXXX") || return 1
+
+    # 只等待本函数启动的任务: 不带参数的 wait 也会等待调用方的进程替换
+    # (例如 watch 的 < <(inotifywait -m ...))，那样永远不会返回
+    for target in "$@"; do
+        while [ "$(jobs -rp | wc -l)" -ge "$max_jobs" ]; do
+            wait -n "${pids[@]}" 2>/dev/null || sleep 0.05
+        done
+        _claude_fanout_one "$worker" "$target" "$results/$(printf '%06d' $i)" &
+        pids+=($!)
+        i=$((i + 1))
+    done
+    [ ${#pids[@]} -eq 0 ] || wait "${pids[@]}"
+
+    local status ms message failed=0
+    echo ""
+    printf '%-12s %12s  %s\n' "状态" "耗时(ms)" "目标"
+    for out in "$results"/[0-9]*[0-9]; do
+        [ -f "$out" ] || continue
+        IFS=$'\t' read -r status ms target message <"$out"
+        case "$status" in
+            failed) failed=$((failed + 1)); printf "${RED}%-10s${NC} %10s  %s  %s\n" "$status" "$ms" "$target" "$message" ;;
+            updated) printf "${GREEN}%-10s${NC} %10s  %s\n" "$status" "$ms" "$target" ;;
+            behind|modified) printf "${YELLOW}%-10s${NC} %10s  %s\n" "$status" "$ms" "$target" ;;
+            *) printf '%-10s %10s  %s\n' "$status" "$ms" "$target" ;;
+        esac
+        # 预演 / 检查模式下列出每个目标的文件明细
+        [ "$CLAUDE_FANOUT_SHOW_LOG" = "1" ] && [ "$status" != "failed" ] && cat "$out.log"
+    done
+
+    echo ""
+    echo "共 $i 个目标: $(cut -f1 "$results"/[0-9]*[0-9] 2>/dev/null | sort | uniq -c \
+        | awk '{ printf "%s%s %s", (NR > 1 ? ", " : ""), $2, $1 }')"
+    [ -n "$CLAUDE_FANOUT_RESULTS" ] && cat "$results"/[0-9]*[0-9] >>"$CLAUDE_FANOUT_RESULTS" 2>/dev/null
+    rm -rf "$results"
+    [ "$failed" -eq 0 ]
+}
@@ -0,0 +1,116 @@
+#!/bin/bash
+# 模板仓库的本地持久镜像
+#
+# 镜像位于 $CLAUDE_SYNC_CACHE/mirrors/<仓库标识>，两个同步脚本共用。
+# 每次运行先用 ls-remote 比较远端分支，只有远端有新提交时才增量 fetch；
+# 离线模式 (CLAUDE_SYNC_OFFLINE=1) 直接使用缓存中的版本。
+# 镜像是 blob:none 的部分克隆: fetch 只取提交和树对象，文件内容在检出工作区时才下载。
+
+# 调用 claude_mirror_prepare 后可用
+CLAUDE_MIRROR_DIR=""
+CLAUDE_MIRROR_REV=""
+
+# 把仓库地址归一化为目录名，https 与 ssh 地址指向同一个镜像
+claude_mirror_key() {
+    local key="${1%.git}"
+    key="${key#*://}"
+    key="${key#*@}"
+    key="${key/://}"
+    echo "$key" | tr -c 'A-Za-z0-9._\n-' '_'
+}
+
+_claude_mirror_clone() {
+    local url="$1" dir="$2"
+    local tmp="$dir.tmp.$$"
+    rm -rf "$tmp"
+    if ! git clone -q --depth 1 --filter=blob:none --sparse --no-checkout \
+        --branch "$CLAUDE_SYNC_BRANCH" "$url" "$tmp" 2>/dev/null; then
+        rm -rf "$tmp"
+        claude_err "无法克隆仓库: $url"
+        return 1
+    fi
+    git -C "$tmp" sparse-checkout set .claude lib || { rm -rf "$tmp"; return 1; }
+    mv "$tmp" "$dir"
+}
+
+_claude_mirror_update() {
+    local url="$1" dir="$2"
+
+    if [ ! -d "$dir/.git" ]; then
+        if [ "$CLAUDE_SYNC_OFFLINE" = "1" ]; then
+            claude_err "离线模式下没有可用的本地镜像: $dir"
+            return 1
+        fi
+        claude_log "首次运行，创建本地镜像..."
+        _claude_mirror_clone "$url" "$dir"
+        return
+    fi
+
+    [ "$CLAUDE_SYNC_OFFLINE" = "1" ] && return 0
+
+    # https 与 ssh 地址共用同一个镜像，按本次传入的地址更新
+    if [ "$(git -C "$dir" remote get-url origin 2>/dev/null)" != "$url" ]; then
+        git -C "$dir" remote set-url origin "$url" || return 1
+    fi
+
+    local remote known
+    remote=$(git -C "$dir" ls-remote origin "refs/heads/$CLAUDE_SYNC_BRANCH" 2>/dev/null | cut -f1)
+    if [ -z "$remote" ]; then
+        claude_warn "无法连接远端仓库，使用本地镜像"
+        return 0
+    fi
+    known=$(git -C "$dir" rev-parse -q --verify "refs/remotes/origin/$CLAUDE_SYNC_BRANCH")
+    [ "$remote" = "$known" ] && return 0
+
+    claude_log "远端有更新，增量拉取..."
+    git -C "$dir" fetch -q --depth 1 --filter=blob:none origin \
+        "+refs/heads/$CLAUDE_SYNC_BRANCH:refs/remotes/origin/$CLAUDE_SYNC_BRANCH"
+}
+
+# 把工作区检出到最新提交，一次性下载 .claude 与 lib 的文件内容
+_claude_mirror_checkout() {
+    local dir="$1" rev="$2"
+    [ "$(git -C "$dir" rev-parse -q --verify HEAD)" = "$rev" ] \
+        && [ -n "$(git -C "$dir" ls-files -- .claude | head -n 1)" ] && return 0
+    git -C "$dir" reset -q --hard "$rev"
+}
+
+# 通过 curl 运行时，用镜像中的 lib 刷新缓存里的副本，下次运行即为最新版本
+_claude_mirror_refresh_lib() {
+    [ "$CLAUDE_SYNC_LIB_DIR" = "$CLAUDE_SYNC_CACHE/lib" ] || return 0
+    git -C "$CLAUDE_MIRROR_DIR" cat-file -e "$CLAUDE_MIRROR_REV:lib" 2>/dev/null || return 0
+    # 先解压到临时目录，再逐个 mv 替换，其他正在 source 这些文件的进程不会读到写了一半的内容
+    local tmp file
+    tmp=$(mktemp -d "$CLAUDE_SYNC_CACHE/lib.tmp.XXXXXX") || return 0
+    if git -C "$CLAUDE_MIRROR_DIR" archive "$CLAUDE_MIRROR_REV" lib | tar -x -C "$tmp"; then
+        for file in "$tmp"/lib/*.sh; do
+            [ -f "$file" ] && mv -f "$file" "$CLAUDE_SYNC_LIB_DIR/${file##*/}"
+        done
+    fi
+    rm -rf "$tmp"
+}
+
+# 准备镜像: claude_mirror_prepare <仓库地址> [--tree-only]
+# --tree-only 只更新提交和树对象，不下载文件内容 (供 check 使用)
+claude_mirror_prepare() {
+    local url="$1" tree_only="$2"
+    CLAUDE_MIRROR_DIR="$CLAUDE_SYNC_CACHE/mirrors/$(claude_mirror_key "$url")"
+    mkdir -p "$CLAUDE_SYNC_CACHE/mirrors" || return 1
+
+    claude_timed mirror.fetch claude_with_lock "$CLAUDE_MIRROR_DIR.lock" \
+        _claude_mirror_update "$url" "$CLAUDE_MIRROR_DIR" || return 1
+
+    # 之后只按提交读取对象，其他进程更新工作区不会影响本次同步
+    CLAUDE_MIRROR_REV=$(git -C "$CLAUDE_MIRROR_DIR" rev-parse -q --verify \
+        "refs/remotes/origin/$CLAUDE_SYNC_BRANCH") || return 1
+    if ! git -C "$CLAUDE_MIRROR_DIR" cat-file -e "$CLAUDE_MIRROR_REV:.claude" 2>/dev/null; then
+        claude_err "无法从仓库获取 .claude 文件夹"
+        return 1
+    fi
+    [ "$tree_only" = "--tree-only" ] && return 0
+
+    claude_timed mirror.checkout claude_with_lock "$CLAUDE_MIRROR_DIR.lock" \
+        _claude_mirror_checkout "$CLAUDE_MIRROR_DIR" "$CLAUDE_MIRROR_REV" || return 1
+    _claude_mirror_refresh_lib
+    return 0
+}
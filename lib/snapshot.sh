@@ -0,0 +1,119 @@
+#!/bin/bash
+# .claude 快照库，替代每次同步前的 .claude.backup.<时间戳> 整目录复制
+#
+# 快照保存在目标目录下的 .claude.snapshots (一个 git 对象库)：
+# 文件内容按哈希存储，相同内容在所有快照中只保存一份。
+# 每个快照是 refs/snapshots/<编号> 指向的一个独立提交，便于按保留策略单独删除。
+# .claude 没有变化时不会生成新快照，只需要一次 git add 的 stat 检查。
+
+CLAUDE_SNAPSHOT_DIR=".claude.snapshots"
+# 保留策略: 保留最近 N 个快照；设置天数时同时删除更早的快照 (最新的快照始终保留)
+CLAUDE_SNAPSHOT_KEEP="${CLAUDE_SNAPSHOT_KEEP:-10}"
+CLAUDE_SNAPSHOT_MAX_AGE="${CLAUDE_SNAPSHOT_MAX_AGE:-}"
+# 最近一次 claude_snapshot_take 生成的快照编号 (无变化时为空)
+CLAUDE_SNAPSHOT_ID=""
+
+_claude_snapshot_git() {
+    local target="$1"
+    shift
+    GIT_AUTHOR_NAME=claude-sync GIT_AUTHOR_EMAIL=claude-sync@localhost \
+        GIT_COMMITTER_NAME=claude-sync GIT_COMMITTER_EMAIL=claude-sync@localhost \
+        git --git-dir="$target/$CLAUDE_SNAPSHOT_DIR" --work-tree="$target/.claude" "$@"
+}
+
+_claude_snapshot_init() {
+    local store="$1/$CLAUDE_SNAPSHOT_DIR"
+    [ -d "$store/objects" ] && return 0
+    git init -q --bare "$store" || return 1
+    git --git-dir="$store" config core.bare false
+    git --git-dir="$store" config core.autocrlf false
+    # 让目标项目自己的 git 忽略快照库
+    echo "*" >"$store/.gitignore"
+}
+
+_claude_snapshot_latest() {
+    _claude_snapshot_git "$1" for-each-ref --count=1 --sort=-refname --sort=-committerdate \
+        --format='%(refname:strip=2)' refs/snapshots
+}
+
+# 为目标的 .claude 生成快照: claude_snapshot_take <目标项目路径> [说明]
+claude_snapshot_take() {
+    local target message tree latest id
+    target=$(cd "$1" && pwd) || return 1
+    message="${2:-manual}"
+    CLAUDE_SNAPSHOT_ID=""
+    [ -d "$target/.claude" ] || return 0
+
+    _claude_snapshot_init "$target" || return 1
+    # -f: .claude 内的 .gitignore 也不能让文件漏掉，回滚必须完全还原
+    (cd "$target/.claude" && _claude_snapshot_git "$target" add -A -f .) || return 1
+    tree=$(_claude_snapshot_git "$target" write-tree) || return 1
+
+    latest=$(_claude_snapshot_latest "$target")
+    if [ -n "$latest" ] && [ "$(_claude_snapshot_git "$target" rev-parse "refs/snapshots/$latest^{tree}")" = "$tree" ]; then
+        return 0
+    fi
+
+    id=$(date +%Y%m%d_%H%M%S)
+    local base="$id" n=1
+    while _claude_snapshot_git "$target" show-ref -q --verify "refs/snapshots/$id"; do
+        n=$((n + 1))
+        id="${base}_$n"
+    done
+    local commit
+    commit=$(echo "$message" | _claude_snapshot_git "$target" commit-tree "$tree") || return 1
+    _claude_snapshot_git "$target" update-ref "refs/snapshots/$id" "$commit" || return 1
+    CLAUDE_SNAPSHOT_ID="$id"
+}
+
+# 列出快照 (最新在前): claude_snapshot_list <目标项目路径>
+claude_snapshot_list() {
+    local target="$1"
+    [ -d "$target/$CLAUDE_SNAPSHOT_DIR" ] || return 0
+    _claude_snapshot_git "$target" for-each-ref --sort=-refname --sort=-committerdate \
+        --format='%(refname:strip=2)  %(committerdate:iso8601)  %(contents:subject)' refs/snapshots
+}
+
+# 把 .claude 还原为指定快照: claude_snapshot_rollback <目标项目路径> <快照编号>
+# 还原前会先为当前状态生成快照，回滚本身也可以撤销
+claude_snapshot_rollback() {
+    local target id="$2"
+    target=$(cd "$1" && pwd) || return 1
+    if ! _claude_snapshot_git "$target" show-ref -q --verify "refs/snapshots/$id" 2>/dev/null; then
+        claude_err "快照不存在: $id"
+        return 1
+    fi
+
+    mkdir -p "$target/.claude" || return 1
+    claude_snapshot_take "$target" "rollback 前的状态" || return 1
+    [ -n "$CLAUDE_SNAPSHOT_ID" ] && claude_ok "当前状态已保存为快照 $CLAUDE_SNAPSHOT_ID"
+
+    # 索引与工作区一致，read-tree -u 会写入差异文件并删除快照中没有的文件
+    (cd "$target/.claude" && _claude_snapshot_git "$target" read-tree -u --reset "refs/snapshots/$id") || return 1
+}
+
+# 按保留策略删除旧快照: claude_snapshot_prune <目标项目路径> [保留个数] [天数]
+claude_snapshot_prune() {
+    local target="$1" keep="${2:-$CLAUDE_SNAPSHOT_KEEP}" max_age="${3:-$CLAUDE_SNAPSHOT_MAX_AGE}"
+    [ -d "$target/$CLAUDE_SNAPSHOT_DIR" ] || return 0
+
+    local cutoff=0
+    [ -n "$max_age" ] && cutoff=$(($(date +%s) - max_age * 86400))
+
+    local rank=0 removed=0 id ts
+    while read -r id ts; do
+        rank=$((rank + 1))
+        [ "$rank" -eq 1 ] && continue
+        if [ "$rank" -gt "$keep" ] || [ "$ts" -lt "$cutoff" ]; then
+            _claude_snapshot_git "$target" update-ref -d "refs/snapshots/$id" || return 1
+            removed=$((removed + 1))
+        fi
+    done < <(_claude_snapshot_git "$target" for-each-ref --sort=-refname --sort=-committerdate \
+        --format='%(refname:strip=2) %(committerdate:unix)' refs/snapshots)
+
+    if [ "$removed" -gt 0 ]; then
+        _claude_snapshot_git "$target" reflog expire --expire=now --all
+        _claude_snapshot_git "$target" gc -q --prune=now || return 1
+        claude_ok "已删除 $removed 个旧快照"
+    fi
+}
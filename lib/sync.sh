@@ -0,0 +1,174 @@
+#!/bin/bash
+# 单个目标目录的同步逻辑，单目标模式与批量模式共用
+#
+# 先调用 claude_sync_stage 读取模板 .claude 的文件列表 (每次运行只读取一次)，
+# 再对每个目标调用 claude_sync_target。
+#
+# 每个目标在 .claude/.sync-manifest 中记录上次同步写入的文件及其 git blob 哈希，
+# 格式为每行 "<mode> <hash>\t<相对路径>"。同步时只写入哈希变化的文件，
+# 删除模板中已移除的文件；模板没有变化时不产生任何写入。
+# 写入前用 lib/snapshot.sh 为原有 .claude 生成快照。
+
+CLAUDE_SYNC_MANIFEST=".sync-manifest"
+CLAUDE_SYNC_DRY_RUN="${CLAUDE_SYNC_DRY_RUN:-0}"
+CLAUDE_SYNC_STAGE=""
+# 最近一次 claude_sync_target 的结果: unchanged / updated
+CLAUDE_SYNC_RESULT=""
+
+# 从镜像读取文件列表，只需要树对象，不需要读取文件内容
+claude_sync_stage() {
+    CLAUDE_SYNC_STAGE=$(mktemp -d "${TMPDIR:-/tmp}/claude-sync-stage.XXXXXX") || return 1
+    git -C "$CLAUDE_MIRROR_DIR" ls-tree -r --full-tree "$CLAUDE_MIRROR_REV" -- .claude \
+        | awk -F'\t' -v manifest="$CLAUDE_SYNC_MANIFEST" '{
+            split($1, f, " ")
+            path = substr($2, 9)
+            if (f[2] == "blob" && path != manifest) print f[1] " " f[3] "\t" path
+        }' >"$CLAUDE_SYNC_STAGE/tree"
+}
+
+claude_sync_cleanup() {
+    [ -n "$CLAUDE_SYNC_STAGE" ] && rm -rf "$CLAUDE_SYNC_STAGE"
+    CLAUDE_SYNC_STAGE=""
+}
+
+# 对比清单与模板，输出 "<动作>\t<mode> <hash>\t<路径>"
+# 动作: keep (清单一致) / write (哈希变化) / new (清单中没有) / delete (模板已移除)
+_claude_sync_diff() {
+    local manifest="$1"
+    [ -f "$manifest" ] || manifest=/dev/null
+    awk -F'\t' 'FILENAME == ARGV[1] { old[$2] = $1; next }
+        {
+            if ($2 in old) {
+                print ($1 == old[$2] ? "keep" : "write") "\t" $1 "\t" $2
+                delete old[$2]
+            } else {
+                print "new\t" $1 "\t" $2
+            }
+        }
+        END { for (p in old) print "delete\t" old[p] "\t" p }' "$manifest" "$CLAUDE_SYNC_STAGE/tree"
+}
+
+# 计算需要执行的变更，输出 "<+|~|->\t<mode> <hash>\t<路径>"
+_claude_sync_plan() {
+    local dir="$1"
+    local action key path
+    local -a unknown_keys=() unknown_paths=()
+
+    while IFS=$'\t' read -r action key path; do
+        case "$action" in
+            keep)
+                [ -e "$dir/$path" ] || [ -L "$dir/$path" ] || printf '+\t%s\t%s\n' "$key" "$path"
+                ;;
+            write)
+                if [ -e "$dir/$path" ]; then
+                    printf '~\t%s\t%s\n' "$key" "$path"
+                else
+                    printf '+\t%s\t%s\n' "$key" "$path"
+                fi
+                ;;
+            new)
+                if [ -f "$dir/$path" ]; then
+                    unknown_keys+=("$key")
+                    unknown_paths+=("$path")
+                else
+                    printf '+\t%s\t%s\n' "$key" "$path"
+                fi
+                ;;
+            delete)
+                [ -e "$dir/$path" ] || [ -L "$dir/$path" ] && printf -- '-\t%s\t%s\n' "$key" "$path"
+                ;;
+        esac
+    done < <(_claude_sync_diff "$dir/$CLAUDE_SYNC_MANIFEST")
+
+    # 清单中没有记录的已有文件 (首次同步): 内容相同就直接记入清单，不重写
+    [ ${#unknown_paths[@]} -eq 0 ] && return 0
+    local i=0 sha
+    while IFS= read -r sha; do
+        [ "$sha" = "${unknown_keys[$i]#* }" ] || printf '~\t%s\t%s\n' "${unknown_keys[$i]}" "${unknown_paths[$i]}"
+        i=$((i + 1))
+    done < <(for path in "${unknown_paths[@]}"; do echo "$dir/$path"; done \
+        | git hash-object --no-filters --stdin-paths)
+    return 0
+}
+
+_claude_sync_delete() {
+    local dir="$1" path="$2"
+    rm -f "$dir/$path" || return 1
+    # 清理删除后留下的空目录
+    local parent
+    parent=$(dirname "$path")
+    while [ "$parent" != "." ] && rmdir "$dir/$parent" 2>/dev/null; do
+        parent=$(dirname "$parent")
+    done
+    return 0
+}
+
+# 按计划写入 / 删除文件，并更新清单
+# 需要写入的文件放进一个临时索引，由 git checkout-index 一次性写出 (含目录、可执行位和符号链接)
+_claude_sync_apply() {
+    local dir="$1" plan="$2"
+    mkdir -p "$dir" || return 1
+    local abs writes
+    abs=$(cd "$dir" && pwd) || return 1
+
+    writes=$(awk -F'\t' '$1 != "-" { print $2 "\t" $3 }' <<<"$plan")
+    if [ -n "$writes" ]; then
+        local index
+        index=$(mktemp "$CLAUDE_SYNC_STAGE/index.XXXXXX") && rm -f "$index" || return 1
+        GIT_INDEX_FILE="$index" git -C "$CLAUDE_MIRROR_DIR" update-index --index-info <<<"$writes" \
+            && GIT_INDEX_FILE="$index" git -C "$CLAUDE_MIRROR_DIR" checkout-index -a -f --prefix="$abs/"
+        local rc=$?
+        rm -f "$index"
+        [ "$rc" -eq 0 ] || return 1
+    fi
+
+    local action key path
+    while IFS=$'\t' read -r action key path; do
+        [ -n "$action" ] || continue
+        if [ "$action" = "-" ]; then
+            _claude_sync_delete "$dir" "$path" || return 1
+        fi
+        echo "  $action $path"
+    done <<<"$plan"
+
+    cp "$CLAUDE_SYNC_STAGE/tree" "$dir/$CLAUDE_SYNC_MANIFEST.tmp.${BASHPID:-$$}" \
+        && mv "$dir/$CLAUDE_SYNC_MANIFEST.tmp.${BASHPID:-$$}" "$dir/$CLAUDE_SYNC_MANIFEST"
+}
+
+# 同步一个目标: claude_sync_target <目标项目路径>
+claude_sync_target() {
+    local target="$1"
+    local dir="$target/.claude"
+    CLAUDE_SYNC_RESULT=""
+
+    if [ ! -d "$target" ]; then
+        claude_err "目标目录不存在: $target"
+        return 1
+    fi
+
+    local plan
+    plan=$(claude_timed sync.plan _claude_sync_plan "$dir") || return 1
+
+    # 清单已与模板一致且没有待写文件: 不做任何写入
+    if [ -z "$plan" ] && cmp -s "$dir/$CLAUDE_SYNC_MANIFEST" "$CLAUDE_SYNC_STAGE/tree"; then
+        CLAUDE_SYNC_RESULT=unchanged
+        return 0
+    fi
+
+    if [ "$CLAUDE_SYNC_DRY_RUN" = "1" ]; then
+        [ -n "$plan" ] && awk -F'\t' '{ print "  " $1 " " $3 }' <<<"$plan"
+        CLAUDE_SYNC_RESULT=$([ -n "$plan" ] && echo updated || echo unchanged)
+        return 0
+    fi
+
+    if [ -n "$plan" ]; then
+        claude_timed sync.snapshot claude_snapshot_take "$target" "sync 前的状态" || return 1
+        if [ -n "$CLAUDE_SNAPSHOT_ID" ]; then
+            claude_ok "已保存快照 $CLAUDE_SNAPSHOT_ID"
+            claude_snapshot_prune "$target" || return 1
+        fi
+    fi
+
+    claude_timed sync.write _claude_sync_apply "$dir" "$plan" || return 1
+    CLAUDE_SYNC_RESULT=$([ -n "$plan" ] && echo updated || echo unchanged)
+}
@@ -0,0 +1,301 @@
+#!/bin/bash
+# 监听模式: 模板 .claude 变化后自动推送到已注册的目标目录
+#
+# 来源可以是模板的本地工作区 (--source，inotifywait 监听，没有时轮询文件状态)，
+# 也可以是远端仓库的本地镜像 (按间隔 ls-remote，提交变化时增量拉取)。
+# 一批变化在静默 CLAUDE_WATCH_DEBOUNCE 秒后合并为一次推送；推送复用 claude_sync_target，
+# 按各目标的 .sync-manifest 只写入变化的文件。
+#
+# 目标列表和每个目标的同步次数、失败次数、延迟 (检测到变化到写入完成) 保存在
+# $CLAUDE_SYNC_CACHE/watch 下，由 claude_watch_status 输出。
+
+CLAUDE_WATCH_DIR="$CLAUDE_SYNC_CACHE/watch"
+CLAUDE_WATCH_DEBOUNCE="${CLAUDE_WATCH_DEBOUNCE:-0.3}"
+# 轮询间隔 (秒)，默认本地来源 1 秒、远端仓库 30 秒
+CLAUDE_WATCH_INTERVAL="${CLAUDE_WATCH_INTERVAL:-}"
+CLAUDE_WATCH_POLL="${CLAUDE_WATCH_POLL:-0}"
+# inotifywait 的输出 fd 和进程号 (inotify 模式)
+CLAUDE_WATCH_EVENTS_FD=""
+CLAUDE_WATCH_INOTIFY_PID=""
+
+# 注册目标: claude_watch_register <目标项目路径...>
+claude_watch_register() {
+    local registry="$CLAUDE_WATCH_DIR/targets" target abs added=0
+    mkdir -p "$CLAUDE_WATCH_DIR" || return 1
+    touch "$registry"
+    for target in "$@"; do
+        if ! abs=$(cd "$target" 2>/dev/null && pwd); then
+            claude_err "目标目录不存在: $target"
+            return 1
+        fi
+        grep -qxF "$abs" "$registry" && continue
+        echo "$abs" >>"$registry"
+        added=$((added + 1))
+    done
+    [ "$added" -gt 0 ] && claude_ok "已注册 $added 个目标"
+    return 0
+}
+
+# 取消注册: claude_watch_unregister <目标项目路径...>
+claude_watch_unregister() {
+    local registry="$CLAUDE_WATCH_DIR/targets" target abs
+    [ -f "$registry" ] || return 0
+    for target in "$@"; do
+        abs=$(cd "$target" 2>/dev/null && pwd) || abs="$target"
+        grep -vxF "$abs" "$registry" >"$registry.tmp.$$"
+        mv "$registry.tmp.$$" "$registry"
+        if [ -f "$CLAUDE_WATCH_DIR/stats" ]; then
+            awk -F'\t' -v t="$abs" '$1 != t' "$CLAUDE_WATCH_DIR/stats" >"$CLAUDE_WATCH_DIR/stats.tmp.$$" \
+                && mv "$CLAUDE_WATCH_DIR/stats.tmp.$$" "$CLAUDE_WATCH_DIR/stats"
+        fi
+    done
+    return 0
+}
+
+_claude_watch_targets() {
+    [ -f "$CLAUDE_WATCH_DIR/targets" ] && grep . "$CLAUDE_WATCH_DIR/targets"
+}
+
+_claude_watch_running() {
+    local pid
+    pid=$(cat "$CLAUDE_WATCH_DIR/watch.lock/pid" 2>/dev/null) && kill -0 "$pid" 2>/dev/null
+}
+
+# 从本地工作区生成文件列表，格式与 claude_sync_stage 相同；文件内容写入 watch/store 对象库
+_claude_watch_stage_local() {
+    local src="$1" store="$CLAUDE_WATCH_DIR/store"
+    [ -d "$store/.git" ] || git init -q "$store" || return 1
+
+    local hashes
+    hashes=$(claude_hash_tree "$src/.claude") || return 1
+    # 来源是 git 工作区时跳过被忽略的文件 (如 settings.local.json)
+    if [ -n "$hashes" ] && git -C "$src" rev-parse --is-inside-work-tree >/dev/null 2>&1; then
+        hashes=$(awk -F'\t' 'FILENAME == ARGV[1] { ignored[substr($0, 9)] = 1; next } !($2 in ignored)' \
+            <(cut -f2 <<<"$hashes" | sed 's|^|.claude/|' | git -C "$src" check-ignore --stdin) <(echo "$hashes"))
+    fi
+
+    local sha path mode
+    local -a files=() links=()
+    : >"$CLAUDE_SYNC_STAGE/tree.new"
+    while IFS=$'\t' read -r sha path; do
+        [ -n "$path" ] || continue
+        if [ -L "$src/.claude/$path" ]; then
+            mode=120000
+        elif [ -x "$src/.claude/$path" ]; then
+            mode=100755
+        else
+            mode=100644
+        fi
+        printf '%s %s\t%s\n' "$mode" "$sha" "$path" >>"$CLAUDE_SYNC_STAGE/tree.new"
+    done <<<"$hashes"
+
+    # 对象库中还没有的内容才需要写入
+    while IFS=$'\t' read -r mode path; do
+        if [ "$mode" = "120000" ]; then
+            links+=("$path")
+        else
+            files+=("$src/.claude/$path")
+        fi
+    done < <(awk -F'\t' 'FILENAME == ARGV[1] { miss[$1] = 1; next } { split($1, f, " ") } f[2] in miss { print f[1] "\t" $2 }' \
+        <(awk '{ print $2 }' "$CLAUDE_SYNC_STAGE/tree.new" | git -C "$store" cat-file --batch-check \
+            | awk '$2 == "missing" { print $1 }') "$CLAUDE_SYNC_STAGE/tree.new")
+    if [ ${#files[@]} -gt 0 ]; then
+        printf '%s\n' "${files[@]}" | git -C "$store" hash-object -w --no-filters --stdin-paths >/dev/null || return 1
+    fi
+    for path in "${links[@]}"; do
+        printf '%s' "$(readlink "$src/.claude/$path")" | git -C "$store" hash-object -w --stdin >/dev/null || return 1
+    done
+
+    LC_ALL=C sort -t$'\t' -k2 "$CLAUDE_SYNC_STAGE/tree.new" >"$CLAUDE_SYNC_STAGE/tree"
+    rm -f "$CLAUDE_SYNC_STAGE/tree.new"
+    CLAUDE_MIRROR_DIR="$store"
+}
+
+# 把本次推送的结果计入各目标的计数器
+# stats 每行: 目标 同步次数 失败次数 最近延迟 延迟合计 最大延迟 最近时间 最近状态 最近错误
+_claude_watch_record() {
+    local results="$1" base="$2" stats="$CLAUDE_WATCH_DIR/stats"
+    [ -f "$stats" ] || : >"$stats"
+    awk -F'\t' -v OFS='\t' -v base="$base" -v now="$(date +%s)" '
+        FILENAME == ARGV[1] { row[$1] = $0; order[++n] = $1; next }
+        {
+            status = $1; ms = $2 + base; t = $3
+            if (t in row) split(row[t], f, "\t")
+            else { order[++n] = t; split(t "\t0\t0\t0\t0\t0\t\t\t", f, "\t") }
+            errors = f[3] + (status == "failed")
+            err = (status == "failed") ? $4 : f[9]
+            row[t] = t OFS (f[2] + 1) OFS errors OFS ms OFS (f[5] + ms) OFS (ms > f[6] ? ms : f[6]) OFS now OFS status OFS err
+        }
+        END { for (i = 1; i <= n; i++) print row[order[i]] }' "$stats" "$results" >"$stats.tmp.$$" \
+        && mv "$stats.tmp.$$" "$stats"
+}
+
+# 推送到所有已注册目标: _claude_watch_push <检测到变化的时间 (毫秒)> <并发数>
+_claude_watch_push() {
+    local detected="$1" jobs="$2"
+    local -a targets=()
+    local target
+    while IFS= read -r target; do
+        targets+=("$target")
+    done < <(_claude_watch_targets)
+    if [ ${#targets[@]} -eq 0 ]; then
+        claude_warn "没有已注册的目标"
+        return 0
+    fi
+
+    local results base
+    results=$(mktemp "${TMPDIR:-/tmp}/claude-watch.XXXXXX") || return 1
+    base=$(($(claude_now_ms) - detected))
+    claude_log "$(date '+%H:%M:%S') 推送到 ${#targets[@]} 个目标..."
+    CLAUDE_FANOUT_RESULTS="$results" claude_fanout "$jobs" claude_sync_target "${targets[@]}" \
+        || claude_warn "部分目标同步失败，详见 status"
+    _claude_watch_record "$results" "$base"
+    rm -f "$results"
+    return 0
+}
+
+# 本地来源的文件状态签名，轮询时用于判断是否有变化
+_claude_watch_signature() {
+    _claude_stat_list "$1/.claude" | LC_ALL=C sort | cksum
+}
+
+# 在首次读取来源之前启动 inotifywait，首次推送期间的修改也会产生事件
+_claude_watch_inotify_start() {
+    exec {CLAUDE_WATCH_EVENTS_FD}< <(exec inotifywait -m -r -q -e close_write,create,delete,move,attrib \
+        --format '%w%f' "$1/.claude")
+    CLAUDE_WATCH_INOTIFY_PID=$!
+}
+
+_claude_watch_local_inotify() {
+    local src="$1" jobs="$2" detected
+    while read -r -u "$CLAUDE_WATCH_EVENTS_FD" _; do
+        detected=$(claude_now_ms)
+        # 去抖: 持续有事件时继续等待，静默 CLAUDE_WATCH_DEBOUNCE 秒后再推送
+        while read -r -t "$CLAUDE_WATCH_DEBOUNCE" -u "$CLAUDE_WATCH_EVENTS_FD" _; do :; done
+        _claude_watch_stage_local "$src" && _claude_watch_push "$detected" "$jobs"
+    done
+    claude_err "inotifywait 已退出"
+    return 1
+}
+
+# 轮询: _claude_watch_local_poll <来源> <并发数> <首次读取来源前的状态签名>
+_claude_watch_local_poll() {
+    local src="$1" jobs="$2" last="$3" current detected
+    while sleep "$CLAUDE_WATCH_INTERVAL"; do
+        current=$(_claude_watch_signature "$src")
+        [ "$current" = "$last" ] && continue
+        detected=$(claude_now_ms)
+        last="$current"
+        while sleep "$CLAUDE_WATCH_DEBOUNCE"; do
+            current=$(_claude_watch_signature "$src")
+            [ "$current" = "$last" ] && break
+            last="$current"
+        done
+        _claude_watch_stage_local "$src" && _claude_watch_push "$detected" "$jobs"
+    done
+}
+
+_claude_watch_remote() {
+    local url="$1" jobs="$2" last="$CLAUDE_MIRROR_REV" detected
+    while sleep "$CLAUDE_WATCH_INTERVAL"; do
+        detected=$(claude_now_ms)
+        if ! claude_mirror_prepare "$url" >/dev/null; then
+            claude_warn "更新镜像失败，稍后重试"
+            continue
+        fi
+        [ "$CLAUDE_MIRROR_REV" = "$last" ] && continue
+        last="$CLAUDE_MIRROR_REV"
+        claude_sync_cleanup
+        claude_sync_stage && _claude_watch_push "$detected" "$jobs"
+    done
+}
+
+# 持续监听并推送: claude_watch_run <并发数> <本地来源目录|""> <仓库地址>
+# 启动时先推送一次，使所有目标与来源一致
+claude_watch_run() {
+    local jobs="$1" src="$2" url="$3" detected mode signature=""
+    mkdir -p "$CLAUDE_WATCH_DIR" || return 1
+    # 同一时间只运行一个监听进程；持有锁的进程已退出时接管
+    if ! mkdir "$CLAUDE_WATCH_DIR/watch.lock" 2>/dev/null; then
+        if _claude_watch_running; then
+            claude_err "监听进程已在运行 (pid $(cat "$CLAUDE_WATCH_DIR/watch.lock/pid"))"
+            return 1
+        fi
+        rm -rf "$CLAUDE_WATCH_DIR/watch.lock"
+        mkdir "$CLAUDE_WATCH_DIR/watch.lock" || return 1
+    fi
+    echo $$ >"$CLAUDE_WATCH_DIR/watch.lock/pid"
+
+    detected=$(claude_now_ms)
+    CLAUDE_SYNC_STAGE=$(mktemp -d "${TMPDIR:-/tmp}/claude-sync-stage.XXXXXX") || return 1
+    if [ -n "$src" ]; then
+        src=$(cd "$src" && pwd) || return 1
+        if [ ! -d "$src/.claude" ]; then
+            claude_err "来源目录中没有 .claude: $src"
+            return 1
+        fi
+        if [ "$CLAUDE_WATCH_POLL" != "1" ] && command -v inotifywait >/dev/null 2>&1; then
+            mode=inotify
+        else
+            mode=poll
+            CLAUDE_WATCH_INTERVAL="${CLAUDE_WATCH_INTERVAL:-1}"
+        fi
+        # 先开始监听 (或记录状态签名) 再读取来源，两者之间的修改不会漏掉
+        if [ "$mode" = "inotify" ]; then
+            _claude_watch_inotify_start "$src" || return 1
+        else
+            signature=$(_claude_watch_signature "$src")
+        fi
+        _claude_watch_stage_local "$src" || return 1
+    else
+        mode=remote
+        CLAUDE_WATCH_INTERVAL="${CLAUDE_WATCH_INTERVAL:-30}"
+        claude_mirror_prepare "$url" || return 1
+        claude_sync_stage || return 1
+    fi
+    printf '%s\t%s\t%s\n' "${src:-$url}" "$mode" "$(date '+%Y-%m-%d %H:%M:%S')" >"$CLAUDE_WATCH_DIR/watch.lock/info"
+    claude_log "监听 ${src:-$url} ($mode)，Ctrl-C 退出"
+
+    _claude_watch_push "$detected" "$jobs"
+    case "$mode" in
+        inotify) _claude_watch_local_inotify "$src" "$jobs" ;;
+        poll) _claude_watch_local_poll "$src" "$jobs" "$signature" ;;
+        remote) _claude_watch_remote "$url" "$jobs" ;;
+    esac
+}
+
+claude_watch_stop() {
+    [ -n "$CLAUDE_WATCH_INOTIFY_PID" ] && kill "$CLAUDE_WATCH_INOTIFY_PID" 2>/dev/null
+    [ -d "$CLAUDE_WATCH_DIR/watch.lock" ] || return 0
+    [ "$(cat "$CLAUDE_WATCH_DIR/watch.lock/pid" 2>/dev/null)" = "$$" ] && rm -rf "$CLAUDE_WATCH_DIR/watch.lock"
+    return 0
+}
+
+# 输出监听进程状态和每个目标的计数器
+claude_watch_status() {
+    local src mode started
+    if _claude_watch_running; then
+        IFS=$'\t' read -r src mode started <"$CLAUDE_WATCH_DIR/watch.lock/info"
+        echo "监听进程: 运行中 (pid $(cat "$CLAUDE_WATCH_DIR/watch.lock/pid"), $mode, 启动于 $started)"
+        echo "来源: $src"
+    else
+        echo "监听进程: 未运行"
+    fi
+    echo "已注册目标: $(_claude_watch_targets | wc -l | tr -d ' ')"
+    _claude_watch_targets >/dev/null || return 0
+    local stats="$CLAUDE_WATCH_DIR/stats"
+    [ -f "$stats" ] || stats=/dev/null
+
+    echo ""
+    printf '%-10s %6s %6s %10s %10s %10s  %-19s  %s\n' "状态" "同步" "失败" "平均(ms)" "最近(ms)" "最大(ms)" "最近同步" "目标"
+    _claude_watch_targets | awk -F'\t' '
+        FILENAME == ARGV[1] { row[$1] = $0; next }
+        {
+            if (!($0 in row)) { printf "%-10s %6s %6s %10s %10s %10s  %-19s  %s\n", "-", 0, 0, "-", "-", "-", "-", $0; next }
+            split(row[$0], f, "\t")
+            cmd = "date -d @" f[7] " \"+%Y-%m-%d %H:%M:%S\" 2>/dev/null || date -r " f[7] " \"+%Y-%m-%d %H:%M:%S\""
+            cmd | getline when; close(cmd)
+            printf "%-10s %6d %6d %10d %10d %10d  %-19s  %s\n", f[8], f[2], f[3], f[5] / f[2], f[4], f[6], when, $0
+            if (f[9] != "") printf "%10s 最近错误: %s\n", "", f[9]
+        }' "$stats" -
+}
@@ -4,21 +4,65 @@
 # 用法: ./quick-sync.sh /path/to/target/project
 # 或者: bash <(curl -s https://raw.githubusercontent.com/developer-hq/ClaudeCodeTemplate/main/quick-sync.sh) /target/path
 
-TARGET=${1:-.}
-TEMP="/tmp/claude-sync-$$"
+TARGET=.
+for arg in "$@"; do
+    case "$arg" in
+        --offline) CLAUDE_SYNC_OFFLINE=1 ;;
+        -n|--dry-run) CLAUDE_SYNC_DRY_RUN=1 ;;
+        *) TARGET="$arg" ;;
+    esac
+done
+REPO_URL="${CLAUDE_SYNC_REPO:-https://github.com/developer-hq/ClaudeCodeTemplate.git}"
+
+# 加载共用函数 (通过 curl 运行时从缓存目录加载)
+# 缓存中的 lib 来自之前的运行，版本与本脚本要求的不一致时全部重新下载
+CLAUDE_SYNC_LIB_REQUIRED=2
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" 2>/dev/null && pwd)"
+if [ -f "$SCRIPT_DIR/lib/common.sh" ]; then
+    CLAUDE_SYNC_LIB_DIR="$SCRIPT_DIR/lib"
+else
+    CLAUDE_SYNC_LIB_DIR="${CLAUDE_SYNC_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/claude-sync}/lib"
+    if ! grep -qx "CLAUDE_SYNC_LIB_VERSION=$CLAUDE_SYNC_LIB_REQUIRED" "$CLAUDE_SYNC_LIB_DIR/common.sh" 2>/dev/null; then
+        # 先下载到临时文件再替换，其他正在运行的同步脚本不会读到写了一半的文件；
+        # 旧模块只取消链接 (已加载的进程不受影响)，之后由 claude_require 按需下载新版本
+        mkdir -p "$CLAUDE_SYNC_LIB_DIR" && curl -fsSL \
+            "${CLAUDE_SYNC_RAW_URL:-https://raw.githubusercontent.com/developer-hq/ClaudeCodeTemplate/main}/lib/common.sh" \
+            -o "$CLAUDE_SYNC_LIB_DIR/common.sh.tmp.$$" || { rm -f "$CLAUDE_SYNC_LIB_DIR/common.sh.tmp.$$"; exit 1; }
+        for lib_file in "$CLAUDE_SYNC_LIB_DIR"/*.sh; do
+            [ "$lib_file" = "$CLAUDE_SYNC_LIB_DIR/common.sh" ] || rm -f "$lib_file"
+        done
+        mv "$CLAUDE_SYNC_LIB_DIR/common.sh.tmp.$$" "$CLAUDE_SYNC_LIB_DIR/common.sh" || exit 1
+    fi
+fi
+source "$CLAUDE_SYNC_LIB_DIR/common.sh"
+claude_require mirror || exit 1
+claude_require sync || exit 1
+claude_require snapshot || exit 1
 
 echo "🔄 同步 Claude 配置到: $TARGET"
 
-# 创建临时目录并克隆
-git clone --depth 1 --filter=blob:none --sparse https://github.com/developer-hq/ClaudeCodeTemplate.git "$TEMP" 2>/dev/null
-cd "$TEMP" && git sparse-checkout set .claude
+# 更新本地镜像 (远端无变化时不会重新拉取)
+claude_mirror_prepare "$REPO_URL" || exit 1
 
-# 备份并复制
-[ -d "$TARGET/.claude" ] && cp -r "$TARGET/.claude" "$TARGET/.claude.backup.$(date +%s)" && echo "✓ 已备份原配置"
-cp -r .claude "$TARGET/" && echo "✓ 配置同步完成"
+claude_timed stage claude_sync_stage || exit 1
+trap claude_sync_cleanup EXIT
 
-# 清理
-rm -rf "$TEMP"
+# 保存快照并写入变化的文件 (配置未变化时跳过)
+claude_sync_target "$TARGET" || exit 1
+# 预演模式无论是否有变更都在这里结束，不进入会修改 settings.json 的 Token 配置
+if [ "$CLAUDE_SYNC_DRY_RUN" = "1" ]; then
+    if [ "$CLAUDE_SYNC_RESULT" = "unchanged" ]; then
+        echo "✓ 配置已是最新"
+    else
+        echo "预演模式，以上变更未写入"
+    fi
+    exit 0
+fi
+if [ "$CLAUDE_SYNC_RESULT" = "unchanged" ]; then
+    echo "✓ 配置已是最新"
+else
+    echo "✓ 配置同步完成"
+fi
 
 echo ""
 echo "🔑 请配置你的 Bark Token (用于推送通知)"
@@ -30,9 +74,9 @@ if [ -n "$BARK_TOKEN" ]; then
     if [ -f "$SETTINGS_FILE" ]; then
         # macOS 和 Linux 兼容的 sed 替换
         if [[ "$OSTYPE" == "darwin"* ]]; then
-            sed -i '' "s/YOUR_BARK_TOKEN_HERE/$BARK_TOKEN/g" "$SETTINGS_FILE"
+            claude_timed token sed -i '' "s/YOUR_BARK_TOKEN_HERE/$BARK_TOKEN/g" "$SETTINGS_FILE"
         else
-            sed -i "s/YOUR_BARK_TOKEN_HERE/$BARK_TOKEN/g" "$SETTINGS_FILE"
+            claude_timed token sed -i "s/YOUR_BARK_TOKEN_HERE/$BARK_TOKEN/g" "$SETTINGS_FILE"
         fi
         echo "✓ Bark Token 配置完成"
     fi
@@ -2,6 +2,11 @@
 
 # Claude Code Template Setup - 简化版
 # 仅做必要的初始化：Git + UV
+#
+# 用法: ./setup.sh                 # 交互式初始化当前目录
+#       ./setup.sh --build-cache   # 联网构建共享依赖缓存 (锁定版本 + wheel + pre-commit hook 环境)
+#       ./setup.sh --offline       # 只使用共享缓存，不访问网络
+#       ./setup.sh --incremental-mypy  # 类型检查改用 dmypy 守护进程，只重新检查变更文件及其依赖方
 
 set -e
 
@@ -28,25 +33,181 @@ echo_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
+now_ms() {
+    if [ -n "$EPOCHREALTIME" ]; then
+        local t="${EPOCHREALTIME/[.,]/}"
+        echo $((t / 1000))
+    else
+        echo $(($(date +%s) * 1000))
+    fi
+}
+
+# 阶段计时: 结束时汇总输出；设置 CLAUDE_TIMINGS=<文件> 时同时以 JSON 行追加到该文件
+TIMINGS=()
+timed() {
+    local phase="$1" start ms rc=0
+    shift
+    start=$(now_ms)
+    "$@" || rc=$?
+    ms=$(($(now_ms) - start))
+    TIMINGS+=("$phase $ms")
+    if [ -n "$CLAUDE_TIMINGS" ]; then
+        printf '{"phase": "%s", "ms": %d}\n' "$phase" "$ms" >>"$CLAUDE_TIMINGS"
+    fi
+    return $rc
+}
+
+print_timings() {
+    [ ${#TIMINGS[@]} -gt 0 ] || return 0
+    echo_status "⏱  各阶段耗时："
+    local entry
+    for entry in "${TIMINGS[@]}"; do
+        printf "  %-24s %8s ms\n" "${entry% *}" "${entry##* }"
+    done
+}
+
+# 开发依赖的固定版本，与 .pre-commit-config.yaml 中的 hook 版本保持一致
+DEV_DEPS=(ruff==0.1.6 pytest==7.4.3 mypy==1.7.1 pre-commit==3.5.0 types-requests==2.31.0.10)
+# 共享依赖缓存: uv 的 wheel 缓存、pre-commit hook 环境和锁定的依赖版本，可整体复制到无法联网的机器
+SETUP_CACHE="${CLAUDE_SETUP_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/claude-setup}"
+
+BUILD_CACHE=0
+OFFLINE=0
+INCREMENTAL_MYPY=0
+for arg in "$@"; do
+    case "$arg" in
+        --build-cache) BUILD_CACHE=1 ;;
+        --offline) OFFLINE=1 ;;
+        --incremental-mypy) INCREMENTAL_MYPY=1 ;;
+        *)
+            echo_error "未知参数: $arg"
+            echo "用法: $0 [--build-cache | --offline] [--incremental-mypy]"
+            exit 1
+            ;;
+    esac
+done
+
+# 默认的 mypy hook 在隔离环境中每次完整检查；--incremental-mypy 时改为项目环境中的 dmypy：
+# 守护进程常驻内存，每次提交只重新检查变更的文件和依赖它们的模块
+write_precommit_config() {
+    if [ "$INCREMENTAL_MYPY" = "1" ]; then
+        cat > .pre-commit-config.yaml << 'EOF'
+repos:
+  - repo: https://github.com/astral-sh/ruff-pre-commit
+    rev: v0.1.6
+    hooks:
+      - id: ruff
+        args: [--fix]
+      - id: ruff-format
+
+  - repo: local
+    hooks:
+      - id: dmypy
+        name: mypy (dmypy)
+        entry: uv run dmypy run --timeout 7200 -- .
+        language: system
+        types_or: [python, pyi]
+        pass_filenames: false
+        require_serial: true
+EOF
+        return
+    fi
+    cat > .pre-commit-config.yaml << 'EOF'
+repos:
+  - repo: https://github.com/astral-sh/ruff-pre-commit
+    rev: v0.1.6
+    hooks:
+      - id: ruff
+        args: [--fix]
+      - id: ruff-format
+
+  - repo: https://github.com/pre-commit/mirrors-mypy
+    rev: v1.7.1
+    hooks:
+      - id: mypy
+        additional_dependencies: [types-requests]
+EOF
+}
+
+# 联网构建共享缓存: 解析并下载开发依赖，导出锁定版本，预装 pre-commit hook 环境
+build_cache() {
+    local project="$SETUP_CACHE/lock-project"
+    echo_status "构建共享依赖缓存: $SETUP_CACHE"
+    rm -rf "$project"
+    mkdir -p "$project"
+    export UV_CACHE_DIR="$SETUP_CACHE/uv"
+    export PRE_COMMIT_HOME="$SETUP_CACHE/pre-commit"
+
+    cd "$project"
+    git init -q
+    uv init --no-readme --name claude-template-lock
+    timed cache.resolve uv add --dev --no-sync "${DEV_DEPS[@]}"
+    timed cache.install uv sync
+    # 总是按默认配置预装: 它包含 mirrors-mypy 的环境，dmypy 使用项目环境不需要额外的 hook 环境
+    INCREMENTAL_MYPY=0 write_precommit_config
+    timed cache.pre-commit uv run pre-commit install-hooks
+    uv export --frozen --no-hashes --only-dev --no-emit-project -o "$SETUP_CACHE/constraints.txt"
+    cd - > /dev/null
+
+    echo_success "共享依赖缓存已就绪，之后可以使用 --offline 离线初始化"
+}
+
+# 把缓存中锁定的版本写入 pyproject.toml，离线解析的结果与缓存完全一致
+pin_constraints() {
+    {
+        echo ""
+        echo "[tool.uv]"
+        echo "constraint-dependencies = ["
+        grep -v '^[[:space:]]*#' "$SETUP_CACHE/constraints.txt" | grep . | sed 's/^\(.*\)$/    "\1",/'
+        echo "]"
+    } >> pyproject.toml
+}
+
+# 让项目的 git hook 在提交时也使用共享缓存中的 hook 环境，离线提交不需要重新下载
+pin_hook_cache() {
+    local hook=".git/hooks/pre-commit"
+    [ -f "$hook" ] || return 0
+    { head -n 1 "$hook"; echo "export PRE_COMMIT_HOME=\"$PRE_COMMIT_HOME\""; tail -n +2 "$hook"; } > "$hook.tmp"
+    cat "$hook.tmp" > "$hook"
+    rm -f "$hook.tmp"
+}
+
+# 添加开发依赖: 有共享缓存时离线解析和安装；缓存不完整且未指定 --offline 时改为联网
+add_dev_deps() {
+    if [ -f "$SETUP_CACHE/constraints.txt" ]; then
+        export UV_CACHE_DIR="$SETUP_CACHE/uv"
+        pin_constraints
+        if UV_OFFLINE=1 timed uv.resolve uv add --dev --no-sync "${DEV_DEPS[@]}" \
+            && UV_OFFLINE=1 timed uv.install uv sync; then
+            return 0
+        fi
+        if [ "$OFFLINE" = "1" ]; then
+            echo_error "共享缓存不完整，请先联网运行 ./setup.sh --build-cache"
+            return 1
+        fi
+        echo_warning "共享缓存不完整，改为联网安装"
+    elif [ "$OFFLINE" = "1" ]; then
+        echo_error "没有共享缓存，请先联网运行 ./setup.sh --build-cache"
+        return 1
+    fi
+    timed uv.resolve uv add --dev --no-sync "${DEV_DEPS[@]}"
+    timed uv.install uv sync
+}
+
 echo -e "${BLUE}"
 echo "╔════════════════════════════════════════════╗"
 echo "║        🚀 Claude Code Template             ║"
-echo "║                                            ║" 
+echo "║                                            ║"
 echo "║      快速项目初始化 Git + UV               ║"
 echo "╚════════════════════════════════════════════╝"
 echo -e "${NC}"
 
-# 检查是否在 git 仓库中
-if [ ! -d ".git" ]; then
-    echo_status "初始化 Git 仓库..."
-    git init
-    echo_success "Git 仓库初始化完成"
-else
-    echo_success "Git 仓库已存在"
-fi
-
 # 检查 UV 是否安装
 if ! command -v uv &> /dev/null; then
+    if [ "$OFFLINE" = "1" ]; then
+        echo_error "UV 未安装，离线模式下无法自动安装"
+        exit 1
+    fi
     echo_warning "UV 未安装，正在安装..."
     curl -LsSf https://astral.sh/uv/install.sh | sh
     source ~/.bashrc || source ~/.zshrc || true
@@ -55,44 +216,67 @@ else
     echo_success "UV 已安装: $(uv --version)"
 fi
 
+if [ "$BUILD_CACHE" = "1" ]; then
+    build_cache
+    print_timings
+    exit 0
+fi
+
+# 检查是否在 git 仓库中
+if [ ! -d ".git" ]; then
+    echo_status "初始化 Git 仓库..."
+    timed git.init git init
+    echo_success "Git 仓库初始化完成"
+else
+    echo_success "Git 仓库已存在"
+fi
+
 # 可选：初始化 Python 项目
 echo ""
 read -p "是否初始化 Python 项目? (y/N): " init_python
 if [[ $init_python =~ ^[Yy]$ ]]; then
     echo_status "初始化 Python 项目..."
-    uv init --no-readme
-    
+    timed uv.init uv init --no-readme
+
     # 添加常用开发依赖
     echo_status "添加开发依赖..."
-    uv add --dev ruff pytest mypy pre-commit
-    
+    add_dev_deps
+
     # 配置 pre-commit
     echo_status "配置 pre-commit..."
-    cat > .pre-commit-config.yaml << 'EOF'
-repos:
-  - repo: https://github.com/astral-sh/ruff-pre-commit
-    rev: v0.1.6
-    hooks:
-      - id: ruff
-        args: [--fix]
-      - id: ruff-format
+    write_precommit_config
+    if [ "$INCREMENTAL_MYPY" = "1" ]; then
+        # dmypy 的状态文件不应提交
+        echo ".dmypy.json" >> .gitignore
+        # 首次启动守护进程为冷检查，之后未变更时为热检查
+        echo_status "记录类型检查耗时..."
+        timed mypy.cold uv run dmypy run --timeout 7200 -- . || echo_warning "类型检查未通过"
+        timed mypy.warm uv run dmypy run --timeout 7200 -- . || echo_warning "类型检查未通过"
+        # 测量完停止守护进程，首次提交时由 hook 重新启动
+        uv run dmypy stop > /dev/null 2>&1 || true
+    fi
+
+    # 安装 pre-commit hooks (有共享缓存时 hook 环境已预装，不需要联网)
+    if [ -f "$SETUP_CACHE/constraints.txt" ]; then
+        export PRE_COMMIT_HOME="$SETUP_CACHE/pre-commit"
+        if [ "$OFFLINE" = "1" ] && [ ! -f "$PRE_COMMIT_HOME/db.db" ]; then
+            echo_error "共享缓存中没有 pre-commit hook 环境，请先联网运行 ./setup.sh --build-cache"
+            exit 1
+        fi
+        UV_OFFLINE=1 timed pre-commit.install uv run pre-commit install --install-hooks
+        pin_hook_cache
+    else
+        timed pre-commit.install uv run pre-commit install
+    fi
 
-  - repo: https://github.com/pre-commit/mirrors-mypy
-    rev: v1.7.1
-    hooks:
-      - id: mypy
-        additional_dependencies: [types-requests]
-EOF
-    
-    # 安装 pre-commit hooks
-    uv run pre-commit install
-    
     echo_success "Python 项目初始化完成"
 fi
 
 echo ""
 echo_success "🎉 Claude Code Template 设置完成！"
 echo ""
+print_timings
+echo ""
 echo_status "📋 项目结构："
 echo "├── .claude/                   # Claude 项目配置目录"
 echo "│   ├── agents/               # 专业代理（代码审查、任务分解等）"
@@ -106,4 +290,4 @@ echo_status "🚀 后续操作："
 echo "  claude                       # 启动 Claude Code"
 echo "  /commit                      # 智能Git提交"
 echo "  /create-pr                   # 创建Pull Request"
-echo "  uv add <package>             # 添加 Python 包"
\ No newline at end of file
+echo "  uv add <package>             # 添加 Python 包"
@@ -13,16 +13,187 @@ echo -e "${YELLOW}Claude Config Sync Tool${NC}"
 echo "========================================"
 
 # 检查参数
-if [ $# -eq 0 ]; then
-    echo -e "${RED}用法: $0 <目标项目路径>${NC}"
+usage() {
+    echo -e "${RED}用法: $0 [--offline] [--dry-run] [-j 并发数] <目标项目路径...>${NC}"
+    echo "      $0 [--offline] [--dry-run] [-j 并发数] --manifest <列表文件> | --glob '<模式>' | --stdin"
+    echo "      $0 check [-j 并发数] <目标项目路径...> | --manifest <列表文件> | --glob '<模式>' | --stdin"
+    echo "      $0 snapshot|snapshots [目标项目路径]"
+    echo "      $0 rollback <快照编号> [目标项目路径]"
+    echo "      $0 prune [--keep 个数] [--older-than 天数] [目标项目路径]"
+    echo "      $0 register|unregister <目标项目路径...> | --manifest <列表文件> | --glob '<模式>' | --stdin"
+    echo "      $0 watch [--source <模板工作区>] [--poll] [--interval 秒] [--debounce 秒] [-j 并发数] [目标项目路径...]"
+    echo "      $0 status"
     echo "示例: $0 /path/to/your/project"
+    echo "      $0 -j 8 --glob '/srv/repos/*'"
+    echo "      $0 watch --source ~/src/ClaudeCodeTemplate --glob '/srv/repos/*'"
     exit 1
+}
+
+TARGETS=()
+MANIFEST=""
+GLOB=""
+FROM_STDIN=0
+JOBS="${CLAUDE_SYNC_JOBS:-}"
+KEEP=""
+MAX_AGE=""
+SOURCE=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --offline) CLAUDE_SYNC_OFFLINE=1 ;;
+        -n|--dry-run) CLAUDE_SYNC_DRY_RUN=1 ;;
+        -j|--jobs) JOBS="$2"; shift ;;
+        --manifest) MANIFEST="$2"; shift ;;
+        --glob) GLOB="$2"; shift ;;
+        --stdin) FROM_STDIN=1 ;;
+        --keep) KEEP="$2"; shift ;;
+        --older-than) MAX_AGE="$2"; shift ;;
+        --source) SOURCE="$2"; shift ;;
+        --poll) CLAUDE_WATCH_POLL=1 ;;
+        --interval) CLAUDE_WATCH_INTERVAL="$2"; shift ;;
+        --debounce) CLAUDE_WATCH_DEBOUNCE="$2"; shift ;;
+        -h|--help) usage ;;
+        *) TARGETS+=("$1") ;;
+    esac
+    shift
+done
+
+# 子命令: 漂移检查 / 快照管理 / 监听推送
+COMMAND=""
+case "${TARGETS[0]}" in
+    check|snapshot|snapshots|rollback|prune|register|unregister|watch|status)
+        COMMAND="${TARGETS[0]}"
+        TARGETS=("${TARGETS[@]:1}")
+        ;;
+esac
+
+case "$COMMAND" in
+    ""|check|register|unregister) NEED_TARGETS=1 ;;
+    *) NEED_TARGETS=0 ;;
+esac
+if [ "$NEED_TARGETS" = "1" ] && [ ${#TARGETS[@]} -eq 0 ] && [ -z "$MANIFEST$GLOB" ] && [ "$FROM_STDIN" = "0" ]; then
+    usage
 fi
 
-TARGET_DIR="$1"
-REPO_URL="git@github.com:developer-hq/ClaudeCodeTemplate.git"
-TEMP_DIR="/tmp/claude-config-sync-$$"
+REPO_URL="${CLAUDE_SYNC_REPO:-git@github.com:developer-hq/ClaudeCodeTemplate.git}"
+
+# 加载共用函数 (通过 curl 运行时从缓存目录加载)
+# 缓存中的 lib 来自之前的运行，版本与本脚本要求的不一致时全部重新下载
+CLAUDE_SYNC_LIB_REQUIRED=2
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" 2>/dev/null && pwd)"
+if [ -f "$SCRIPT_DIR/lib/common.sh" ]; then
+    CLAUDE_SYNC_LIB_DIR="$SCRIPT_DIR/lib"
+else
+    CLAUDE_SYNC_LIB_DIR="${CLAUDE_SYNC_CACHE:-${XDG_CACHE_HOME:-$HOME/.cache}/claude-sync}/lib"
+    if ! grep -qx "CLAUDE_SYNC_LIB_VERSION=$CLAUDE_SYNC_LIB_REQUIRED" "$CLAUDE_SYNC_LIB_DIR/common.sh" 2>/dev/null; then
+        # 先下载到临时文件再替换，其他正在运行的同步脚本不会读到写了一半的文件；
+        # 旧模块只取消链接 (已加载的进程不受影响)，之后由 claude_require 按需下载新版本
+        mkdir -p "$CLAUDE_SYNC_LIB_DIR" && curl -fsSL \
+            "${CLAUDE_SYNC_RAW_URL:-https://raw.githubusercontent.com/developer-hq/ClaudeCodeTemplate/main}/lib/common.sh" \
+            -o "$CLAUDE_SYNC_LIB_DIR/common.sh.tmp.$$" || { rm -f "$CLAUDE_SYNC_LIB_DIR/common.sh.tmp.$$"; exit 1; }
+        for lib_file in "$CLAUDE_SYNC_LIB_DIR"/*.sh; do
+            [ "$lib_file" = "$CLAUDE_SYNC_LIB_DIR/common.sh" ] || rm -f "$lib_file"
+        done
+        mv "$CLAUDE_SYNC_LIB_DIR/common.sh.tmp.$$" "$CLAUDE_SYNC_LIB_DIR/common.sh"
+    fi
+fi
+source "$CLAUDE_SYNC_LIB_DIR/common.sh"
+claude_require mirror
+claude_require sync
+claude_require fanout
+claude_require check
+claude_require snapshot
+claude_require watch
+
+# 汇总命令行、列表文件、glob 和标准输入中的目标到 CLAUDE_FANOUT_TARGETS
+collect_targets() {
+    CLAUDE_FANOUT_TARGETS=("${TARGETS[@]}")
+    if [ -n "$MANIFEST" ]; then
+        claude_fanout_read_list <"$MANIFEST"
+    fi
+    [ -n "$GLOB" ] && claude_fanout_add_glob "$GLOB"
+    [ "$FROM_STDIN" = "1" ] && claude_fanout_read_list
+    claude_fanout_dedupe
+}
+
+# 快照管理和目标注册不需要访问模板仓库；监听模式自行准备来源
+case "$COMMAND" in
+    snapshot)
+        claude_snapshot_take "${TARGETS[0]:-.}" manual
+        if [ -n "$CLAUDE_SNAPSHOT_ID" ]; then
+            echo -e "${GREEN}✓ 已保存快照 $CLAUDE_SNAPSHOT_ID${NC}"
+        else
+            echo -e "${GREEN}✓ .claude 与最近的快照相同，无需保存${NC}"
+        fi
+        exit 0
+        ;;
+    snapshots)
+        claude_snapshot_list "${TARGETS[0]:-.}"
+        exit 0
+        ;;
+    rollback)
+        [ -n "${TARGETS[0]}" ] || usage
+        claude_snapshot_rollback "${TARGETS[1]:-.}" "${TARGETS[0]}"
+        echo -e "${GREEN}✓ 已还原到快照 ${TARGETS[0]}${NC}"
+        exit 0
+        ;;
+    prune)
+        claude_snapshot_prune "${TARGETS[0]:-.}" "$KEEP" "$MAX_AGE"
+        exit 0
+        ;;
+    register)
+        collect_targets
+        claude_watch_register "${CLAUDE_FANOUT_TARGETS[@]}"
+        exit 0
+        ;;
+    unregister)
+        collect_targets
+        claude_watch_unregister "${CLAUDE_FANOUT_TARGETS[@]}"
+        exit 0
+        ;;
+    status)
+        claude_watch_status
+        exit 0
+        ;;
+    watch)
+        # 命令行中给出的目标先加入注册表；之后每次推送都重新读取注册表
+        collect_targets
+        [ ${#CLAUDE_FANOUT_TARGETS[@]} -eq 0 ] || claude_watch_register "${CLAUDE_FANOUT_TARGETS[@]}"
+        trap 'claude_watch_stop; claude_sync_cleanup' EXIT
+        trap 'exit 130' INT TERM
+        claude_watch_run "${JOBS:-$(claude_fanout_default_jobs)}" "$SOURCE" "$REPO_URL"
+        exit $?
+        ;;
+esac
+
+echo -e "${YELLOW}更新本地镜像...${NC}"
+if [ "$COMMAND" = "check" ]; then
+    # 检查只需要模板的树对象，不下载文件内容
+    claude_mirror_prepare "$REPO_URL" --tree-only
+else
+    claude_mirror_prepare "$REPO_URL"
+fi
+claude_timed stage claude_sync_stage
+trap claude_sync_cleanup EXIT
+
+# 批量模式: 列表文件 / glob / 标准输入 / 多个目标；检查模式总是输出汇总表
+if [ "$COMMAND" = "check" ] || [ ${#TARGETS[@]} -ne 1 ] || [ -n "$MANIFEST$GLOB" ] || [ "$FROM_STDIN" = "1" ]; then
+    collect_targets
+    JOBS="${JOBS:-$(claude_fanout_default_jobs)}"
+
+    if [ "$COMMAND" = "check" ]; then
+        echo -e "${YELLOW}检查 ${#CLAUDE_FANOUT_TARGETS[@]} 个目标 (并发 $JOBS)...${NC}"
+        CLAUDE_FANOUT_SHOW_LOG=1
+        claude_timed fanout claude_fanout "$JOBS" claude_check_target "${CLAUDE_FANOUT_TARGETS[@]}"
+        exit $?
+    fi
+
+    echo -e "${YELLOW}同步到 ${#CLAUDE_FANOUT_TARGETS[@]} 个目标 (并发 $JOBS)...${NC}"
+    CLAUDE_FANOUT_SHOW_LOG="$CLAUDE_SYNC_DRY_RUN"
+    claude_timed fanout claude_fanout "$JOBS" claude_sync_target "${CLAUDE_FANOUT_TARGETS[@]}"
+    exit $?
+fi
 
+TARGET_DIR="${TARGETS[0]}"
 echo -e "${YELLOW}目标目录: $TARGET_DIR${NC}"
 
 # 检查目标目录是否存在
@@ -31,38 +202,21 @@ if [ ! -d "$TARGET_DIR" ]; then
     exit 1
 fi
 
-# 备份现有的 .claude 配置
-if [ -d "$TARGET_DIR/.claude" ]; then
-    echo -e "${YELLOW}备份现有 .claude 配置...${NC}"
-    cp -r "$TARGET_DIR/.claude" "$TARGET_DIR/.claude.backup.$(date +%Y%m%d_%H%M%S)"
-    echo -e "${GREEN}✓ 已备份到 .claude.backup.$(date +%Y%m%d_%H%M%S)${NC}"
-fi
-
-echo -e "${YELLOW}克隆仓库到临时目录...${NC}"
-git clone --depth 1 --filter=blob:none --sparse "$REPO_URL" "$TEMP_DIR"
-
-cd "$TEMP_DIR"
-echo -e "${YELLOW}设置 sparse-checkout...${NC}"
-git sparse-checkout set .claude
-
-# 检查是否成功获取到 .claude 文件夹
-if [ ! -d "$TEMP_DIR/.claude" ]; then
-    echo -e "${RED}错误: 无法从仓库获取 .claude 文件夹${NC}"
-    rm -rf "$TEMP_DIR"
-    exit 1
-fi
-
 echo -e "${YELLOW}同步 .claude 配置到目标目录...${NC}"
-cp -r "$TEMP_DIR/.claude" "$TARGET_DIR/"
-
-# 清理临时目录
-rm -rf "$TEMP_DIR"
-
-echo -e "${GREEN}✓ Claude 配置同步完成!${NC}"
+claude_sync_target "$TARGET_DIR"
+
+if [ "$CLAUDE_SYNC_RESULT" = "unchanged" ]; then
+    echo -e "${GREEN}✓ 配置已是最新，无需更新${NC}"
+elif [ "$CLAUDE_SYNC_DRY_RUN" = "1" ]; then
+    echo -e "${YELLOW}预演模式，以上变更未写入${NC}"
+    exit 0
+else
+    echo -e "${GREEN}✓ Claude 配置同步完成!${NC}"
+fi
 echo -e "${YELLOW}位置: $TARGET_DIR/.claude${NC}"
 
 # 显示同步的文件
 echo -e "\n${YELLOW}已同步的文件:${NC}"
 find "$TARGET_DIR/.claude" -type f | sed 's|^|  - |'
 
-echo -e "\n${GREEN}完成! 现在可以在目标项目中使用 Claude Code 了${NC}"
\ No newline at end of file
+echo -e "\n${GREEN}完成! 现在可以在目标项目中使用 Claude Code 了${NC}"